@@ -1,3 +1,62 @@
+"""
+Админка приложения.
+
+Списки рассчитаны на таблицы с миллионами строк: связанные объекты загружаются
+в том же запросе (list_select_related), внешние ключи редактируются по id
+(raw_id_fields) вместо выпадающих списков всех объектов, общее количество
+строк не считается (show_full_result_count = False), а пагинатор оценивает
+количество строк по статистике базы данных (EstimatedCountPaginator).
+Сортировка по умолчанию и фильтры используют индексы.
+"""
 from django.contrib import admin
+from .models import Product, Group, Lesson, ProductAccess
+from .pagination import EstimatedCountPaginator
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Базовый класс админки больших таблиц.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    ordering = ('-id',)
+    list_per_page = 50
+
+
+@admin.register(Product)
+class ProductAdmin(LargeTableAdmin):
+    list_display = (
+        'id', 'name', 'creator', 'start_date', 'price', 'max_group_size', 'students_count', 'average_group_filling'
+    )
+    list_select_related = ('creator',)
+    list_filter = ('start_date',)
+    raw_id_fields = ('creator',)
+    readonly_fields = ('students_count', 'groups_count', 'average_group_filling')
+    search_fields = ('=id',)
+
+
+@admin.register(Group)
+class GroupAdmin(LargeTableAdmin):
+    list_display = ('id', 'name', 'product', 'fill', 'version')
+    list_select_related = ('product',)
+    raw_id_fields = ('product',)
+    readonly_fields = ('fill', 'version')
+    search_fields = ('=id', '=product__id')
+
+
+@admin.register(Lesson)
+class LessonAdmin(LargeTableAdmin):
+    list_display = ('id', 'name', 'product', 'version')
+    list_select_related = ('product',)
+    raw_id_fields = ('product',)
+    readonly_fields = ('version',)
+    search_fields = ('=id', '=product__id')
+
 
-# Register your models here.
+@admin.register(ProductAccess)
+class ProductAccessAdmin(LargeTableAdmin):
+    list_display = ('id', 'user', 'product', 'group', 'created_at')
+    list_select_related = ('user', 'product', 'group')
+    list_filter = ('created_at',)
+    raw_id_fields = ('user', 'product', 'group')
+    search_fields = ('=id', '=user__id', '=product__id')
@@ -0,0 +1,91 @@
+"""
+Асинхронные представления для чтения продуктов и уроков.
+
+Представления используют асинхронный ORM Django и не занимают поток на время
+ожидания базы данных при работе под ASGI-сервером. Элементы ответа имеют ту же
+структуру, что и в ProductViewSet и LessonViewSet, списки разбиваются на страницы
+по id: параметр after задаёт id последнего полученного объекта, page_size - размер
+страницы.
+"""
+from django.conf import settings
+from django.http import Http404, JsonResponse
+from django.views import View
+from rest_framework.settings import api_settings
+from .models import Product, Lesson, Counter
+from .serializers import ProductSerializer, LessonSerializer
+
+
+class AsyncReadView(View):
+    """
+    Базовое асинхронное представление списка и отдельного объекта.
+
+    Атрибуты:
+    - queryset (QuerySet): объекты представления;
+    - serializer_class (Serializer): сериализатор объекта.
+    """
+    http_method_names = ['get', 'head', 'options']
+    queryset = None
+    serializer_class = None
+
+    async def get(self, request, pk=None):
+        context = await self.get_serializer_context()
+        if pk is not None:
+            return await self.retrieve(request, pk, context)
+        return await self.list(request, context)
+
+    async def get_serializer_context(self):
+        return {}
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.GET.get('page_size', api_settings.PAGE_SIZE))
+        except ValueError:
+            page_size = api_settings.PAGE_SIZE
+        return max(1, min(page_size, settings.API_MAX_PAGE_SIZE))
+
+    async def list(self, request, context):
+        page_size = self.get_page_size(request)
+        queryset = self.queryset.order_by('id')
+        after = request.GET.get('after')
+        if after is not None and after.isdigit():
+            queryset = queryset.filter(id__gt=int(after))
+
+        objs = [obj async for obj in queryset[:page_size + 1].aiterator()]
+        results = self.serializer_class(objs[:page_size], many=True, context=context).data
+        next_url = None
+        if len(objs) > page_size:
+            query = request.GET.copy()
+            query['after'] = results[-1]['id']
+            next_url = request.build_absolute_uri(f'{request.path}?{query.urlencode()}')
+        return JsonResponse({'next': next_url, 'results': results})
+
+    async def retrieve(self, request, pk, context):
+        try:
+            obj = await self.queryset.aget(pk=pk)
+        except self.queryset.model.DoesNotExist:
+            raise Http404
+        return JsonResponse(self.serializer_class(obj, context=context).data)
+
+
+class AsyncProductView(AsyncReadView):
+    """
+    Асинхронное представление продуктов.
+
+    purchase_percent вычисляется по аннотации access_count и счётчику пользователей,
+    который читается один раз за запрос.
+    """
+    queryset = Product.objects.with_access_count()
+    serializer_class = ProductSerializer
+
+    async def get_serializer_context(self):
+        context = await super().get_serializer_context()
+        context['total_users'] = await Counter.aget_value(Counter.USERS)
+        return context
+
+
+class AsyncLessonView(AsyncReadView):
+    """
+    Асинхронное представление уроков.
+    """
+    queryset = Lesson.objects.only('id', 'product_id', 'name', 'video_link', 'version')
+    serializer_class = LessonSerializer
@@ -0,0 +1,48 @@
+"""
+Аутентификация API по токену с кешированием проверенных токенов в памяти процесса.
+"""
+import time
+
+from django.conf import settings
+from rest_framework.authentication import TokenAuthentication
+
+_tokens = {}
+
+
+def forget_token(key):
+    """
+    Удаляет токен из кеша текущего процесса.
+    """
+    _tokens.pop(key, None)
+
+
+def forget_user_tokens(user_id):
+    """
+    Удаляет из кеша текущего процесса все токены пользователя.
+    """
+    for key, (user, _, _) in list(_tokens.items()):
+        if user.pk == user_id:
+            _tokens.pop(key, None)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Аутентификация по заголовку "Authorization: Token <ключ>".
+
+    Проверенный токен хранится в памяти процесса API_TOKEN_CACHE_TIMEOUT секунд,
+    поэтому повторные запросы с тем же токеном не обращаются к базе данных.
+    Удаление токена и изменение пользователя сбрасывают кеш текущего процесса
+    (см. signals), в остальных процессах изменения применяются не позже чем
+    через API_TOKEN_CACHE_TIMEOUT секунд. Кеш очищается целиком, когда в нём
+    больше API_TOKEN_CACHE_SIZE токенов.
+    """
+    def authenticate_credentials(self, key):
+        cached = _tokens.get(key)
+        if cached is not None and cached[2] > time.monotonic():
+            return cached[0], cached[1]
+
+        user, token = super().authenticate_credentials(key)
+        if len(_tokens) >= settings.API_TOKEN_CACHE_SIZE:
+            _tokens.clear()
+        _tokens[key] = (user, token, time.monotonic() + settings.API_TOKEN_CACHE_TIMEOUT)
+        return user, token
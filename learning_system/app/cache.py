@@ -0,0 +1,173 @@
+"""
+Кеширование ответов API на основе фреймворка кеширования Django.
+
+Закешированные ответы хранятся под ключами, содержащими номер версии
+пространства имён. Сигналы моделей увеличивают версию, после чего старые
+ключи больше не используются и вытесняются по таймауту. Версия также служит
+ETag ответа, поэтому запрос с совпадающим If-None-Match получает 304 без
+обращения к базе данных.
+
+Кроме ответов кешируются id продуктов, доступных пользователю, и его продукты
+с группами: они удаляются из кеша при изменении доступов пользователя, а продукты
+с группами также при изменении продуктов, групп и уроков (пространство имён
+CATALOGUE_NAMESPACE).
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+from .models import ProductAccess
+
+PRODUCTS_NAMESPACE = 'products'
+CATALOGUE_NAMESPACE = 'catalogue'
+
+
+def _version_key(namespace):
+    return f'{namespace}:version'
+
+
+def get_version(namespace):
+    """
+    Возвращает текущую версию пространства имён кеша.
+
+    Начальная версия основана на времени, чтобы после очистки кеша или
+    перезапуска не совпасть с ETag, сохранённым клиентом ранее.
+    """
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_version(namespace):
+    key = _version_key(namespace)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def invalidate(namespace):
+    """
+    Делает недействительными все закешированные ответы пространства имён.
+
+    Версия увеличивается сразу и ещё раз после фиксации транзакции, чтобы
+    ответ, собранный другим запросом по ещё не зафиксированным данным,
+    не остался в кеше.
+    """
+    _bump_version(namespace)
+    transaction.on_commit(lambda: _bump_version(namespace))
+
+
+def _user_products_key(user_id):
+    return f'user-products:{user_id}'
+
+
+def get_user_product_ids(user_id):
+    """
+    Возвращает отсортированный список id продуктов, к которым у пользователя есть доступ.
+
+    Список читается из кеша, а при его отсутствии - одним запросом к ProductAccess.
+    """
+    key = _user_products_key(user_id)
+    product_ids = cache.get(key)
+    if product_ids is None:
+        product_ids = list(
+            ProductAccess.objects.filter(user_id=user_id).order_by('product_id').values_list('product_id', flat=True)
+        )
+        cache.set(key, product_ids, settings.API_CACHE_TIMEOUT)
+    return product_ids
+
+
+def _user_memberships_key(user_id):
+    return f'user-memberships:{get_version(CATALOGUE_NAMESPACE)}:{user_id}'
+
+
+def get_user_memberships(user_id):
+    """
+    Возвращает продукты пользователя с его группой и количеством уроков.
+
+    Снимок читается из кеша, а при его отсутствии - одним запросом
+    ProductAccess.objects.memberships.
+    """
+    key = _user_memberships_key(user_id)
+    memberships = cache.get(key)
+    if memberships is None:
+        memberships = [
+            {
+                'product': {
+                    'id': row['product_id'],
+                    'name': row['product_name'],
+                    'start_date': row['product_start_date'],
+                },
+                'group': {'id': row['group_id'], 'name': row['group_name']} if row['group_id'] else None,
+                'lessons_count': row['lessons_count'],
+            }
+            for row in ProductAccess.objects.memberships(user_id)
+        ]
+        cache.set(key, memberships, settings.API_CACHE_TIMEOUT)
+    return memberships
+
+
+def invalidate_user_products(user_ids):
+    """
+    Удаляет из кеша списки доступных продуктов и продукты с группами пользователей.
+
+    Как и в invalidate, ключи удаляются сразу и ещё раз после фиксации транзакции.
+    """
+    keys = [key for user_id in user_ids for key in (_user_products_key(user_id), _user_memberships_key(user_id))]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+class CachedResponseMixin:
+    """
+    Примесь для ViewSet, кеширующая ответы list и retrieve.
+
+    Атрибуты:
+    - cache_namespace (str): пространство имён кеша, версия которого определяет
+      актуальность ответов;
+    - cache_timeout (int): время хранения ответа в секундах.
+    """
+    cache_namespace = None
+    cache_timeout = settings.API_CACHE_TIMEOUT
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        """
+        Возвращает ответ из кеша или вызывает handler и сохраняет его ответ.
+
+        Если If-None-Match содержит текущий ETag, возвращается 304 без
+        обращения к базе данных.
+        """
+        version = get_version(self.cache_namespace)
+        digest = hashlib.md5(request.get_full_path().encode()).hexdigest()
+        etag = f'"{version}-{digest}"'
+        client_etags = parse_etags(request.headers.get('If-None-Match', ''))
+        if etag in client_etags or '*' in client_etags:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        key = f'{self.cache_namespace}:{version}:{digest}'
+        data = cache.get(key)
+        if data is not None:
+            return Response(data, headers={'ETag': etag})
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, self.cache_timeout)
+            response['ETag'] = etag
+        return response
@@ -0,0 +1,242 @@
+"""
+Поддержка счётчиков продукта students_count и average_group_filling,
+счётчиков заполнения групп Group.fill, дневных количеств записей на продукт
+(EnrollmentRollup) и регистраций пользователей (SignupRollup).
+
+Среднее заполнение групп хранится в процентах и равно отношению количества
+учеников, распределённых по группам, к суммарной вместимости групп продукта
+groups_count * max_group_size. Количество групп хранится в Product.groups_count,
+поэтому изменение счётчиков не считает группы продукта.
+
+Функции модуля изменяют счётчики одним UPDATE с F()-выражениями, поэтому
+вызываются внутри транзакции, в которой меняется ProductAccess или Group.
+"""
+from django.db.models import Count, F, FloatField, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, NullIf, TruncDate
+from django.contrib.auth.models import User
+from .models import Product, ProductAccess, Group, EnrollmentRollup, SignupRollup
+from . import cache
+
+
+def _count_subquery(queryset):
+    """
+    Возвращает коррелированный подзапрос COUNT по продукту для переданного набора строк.
+    """
+    counts = queryset.filter(product=OuterRef('pk')).order_by().values('product').annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def _groups_count():
+    return _count_subquery(Group.objects.all())
+
+
+def apply_access_delta(product_id, students=0, grouped=0):
+    """
+    Применяет изменение количества учеников продукта.
+
+    Args:
+        product_id (int): идентификатор продукта.
+        students (int): изменение количества учеников на продукте.
+        grouped (int): изменение количества учеников, распределённых по группам.
+    """
+    updates = {}
+    if students:
+        updates['students_count'] = F('students_count') + students
+    if grouped:
+        capacity = NullIf(F('groups_count') * F('max_group_size'), Value(0))
+        updates['average_group_filling'] = Coalesce(
+            F('average_group_filling') + Value(100.0 * grouped) / capacity,
+            Value(0.0),
+            output_field=FloatField(),
+        )
+    if updates:
+        Product.objects.filter(pk=product_id).update(**updates)
+        cache.invalidate(cache.PRODUCTS_NAMESPACE)
+
+
+def apply_group_fill_deltas(deltas):
+    """
+    Применяет изменения количества учеников групп.
+
+    Группы с одинаковым изменением обновляются одним UPDATE, поэтому при
+    распределении нескольких учеников выполняется один-два запроса.
+
+    Args:
+        deltas (dict[int, int]): изменение количества учеников по идентификатору группы.
+    """
+    by_delta = {}
+    for group_id, delta in deltas.items():
+        if group_id is not None and delta:
+            by_delta.setdefault(delta, []).append(group_id)
+    for delta, group_ids in by_delta.items():
+        Group.objects.filter(pk__in=group_ids).update(fill=F('fill') + delta)
+
+
+def rebuild_group_fill(queryset=None):
+    """
+    Пересчитывает количество учеников групп одним UPDATE с коррелированным подзапросом.
+
+    Args:
+        queryset (QuerySet, optional): продукты, группы которых нужно пересчитать, по умолчанию все.
+
+    Returns:
+        int: количество обновлённых групп.
+    """
+    groups = Group.objects.all()
+    if queryset is not None:
+        groups = groups.filter(product__in=queryset)
+    counts = ProductAccess.objects.filter(group=OuterRef('pk')).order_by().values('group').annotate(
+        count=Count('pk')
+    ).values('count')
+    return groups.update(fill=Coalesce(Subquery(counts, output_field=IntegerField()), Value(0)))
+
+
+def apply_group_created(product_id, created=1):
+    """
+    Пересчитывает среднее заполнение после создания новых пустых групп.
+
+    Вместимость продукта увеличивается на created групп, поэтому текущее значение
+    умножается на n / (n + created), где n - количество групп до создания.
+
+    Args:
+        product_id (int): идентификатор продукта.
+        created (int): количество созданных групп.
+    """
+    Product.objects.filter(pk=product_id).update(
+        groups_count=F('groups_count') + created,
+        average_group_filling=Coalesce(
+            F('average_group_filling') * F('groups_count') / NullIf(F('groups_count') + created, Value(0)),
+            Value(0.0),
+            output_field=FloatField(),
+        ),
+    )
+    cache.invalidate(cache.PRODUCTS_NAMESPACE)
+
+
+def apply_group_deleted(product_id, fill):
+    """
+    Пересчитывает среднее заполнение после удаления группы.
+
+    Ученики удалённой группы остаются на продукте без группы, поэтому количество
+    распределённых учеников уменьшается на fill, а вместимость - на одну группу.
+
+    Args:
+        product_id (int): идентификатор продукта.
+        fill (int): количество учеников удалённой группы.
+    """
+    grouped_percent = F('average_group_filling') * F('groups_count') * F('max_group_size')
+    Product.objects.filter(pk=product_id).update(
+        groups_count=F('groups_count') - 1,
+        average_group_filling=Coalesce(
+            (grouped_percent - Value(100.0 * fill)) / NullIf((F('groups_count') - 1) * F('max_group_size'), Value(0)),
+            Value(0.0),
+            output_field=FloatField(),
+        ),
+    )
+    cache.invalidate(cache.PRODUCTS_NAMESPACE)
+
+
+def rebuild_product_counters(queryset=None):
+    """
+    Пересчитывает счётчики продуктов одним UPDATE с коррелированными подзапросами.
+
+    Args:
+        queryset (QuerySet, optional): продукты для пересчёта, по умолчанию все.
+
+    Returns:
+        int: количество обновлённых продуктов.
+    """
+    if queryset is None:
+        queryset = Product.objects.all()
+    groups_count = _groups_count()
+    grouped_count = _count_subquery(ProductAccess.objects.filter(group__isnull=False))
+    cache.invalidate(cache.PRODUCTS_NAMESPACE)
+    return queryset.update(
+        students_count=_count_subquery(ProductAccess.objects.all()),
+        groups_count=groups_count,
+        average_group_filling=Coalesce(
+            grouped_count * 100.0 / NullIf(groups_count * F('max_group_size'), Value(0)),
+            Value(0.0),
+            output_field=FloatField(),
+        ),
+    )
+
+
+def apply_enrollment_delta(product_id, day, delta):
+    """
+    Применяет изменение количества доступов к продукту, предоставленных за день.
+
+    Строка создаётся только при увеличении количества: при каскадном удалении
+    продукта его строки могут быть уже удалены.
+
+    Args:
+        product_id (int): идентификатор продукта.
+        day (date): день предоставления доступа.
+        delta (int): изменение количества доступов.
+    """
+    if not delta:
+        return
+    rollups = EnrollmentRollup.objects.filter(product_id=product_id, day=day)
+    if rollups.update(count=F('count') + delta) or delta < 0:
+        return
+    _, created = EnrollmentRollup.objects.get_or_create(product_id=product_id, day=day, defaults={'count': delta})
+    if not created:
+        rollups.update(count=F('count') + delta)
+
+
+def rebuild_enrollment_rollups(queryset=None):
+    """
+    Пересчитывает дневные количества записей продуктов по доступам.
+
+    Args:
+        queryset (QuerySet, optional): продукты для пересчёта, по умолчанию все.
+
+    Returns:
+        int: количество созданных строк.
+    """
+    accesses = ProductAccess.objects.all()
+    rollups = EnrollmentRollup.objects.all()
+    if queryset is not None:
+        accesses = accesses.filter(product__in=queryset)
+        rollups = rollups.filter(product__in=queryset)
+    rows = accesses.annotate(day=TruncDate('created_at')).order_by().values('product_id', 'day').annotate(
+        count=Count('pk')
+    )
+    rollups.delete()
+    return len(EnrollmentRollup.objects.bulk_create(
+        [EnrollmentRollup(product_id=row['product_id'], day=row['day'], count=row['count']) for row in rows],
+        batch_size=1000,
+    ))
+
+
+def apply_signup_delta(day, delta):
+    """
+    Применяет изменение количества пользователей, зарегистрированных за день.
+
+    Args:
+        day (date): день регистрации.
+        delta (int): изменение количества пользователей.
+    """
+    if not delta:
+        return
+    rollups = SignupRollup.objects.filter(day=day)
+    if rollups.update(count=F('count') + delta) or delta < 0:
+        return
+    _, created = SignupRollup.objects.get_or_create(day=day, defaults={'count': delta})
+    if not created:
+        rollups.update(count=F('count') + delta)
+
+
+def rebuild_signup_rollups():
+    """
+    Пересчитывает дневные количества регистраций по пользователям.
+
+    Returns:
+        int: количество созданных строк.
+    """
+    rows = User.objects.annotate(day=TruncDate('date_joined')).order_by().values('day').annotate(count=Count('pk'))
+    SignupRollup.objects.all().delete()
+    return len(SignupRollup.objects.bulk_create(
+        [SignupRollup(day=row['day'], count=row['count']) for row in rows],
+        batch_size=1000,
+    ))
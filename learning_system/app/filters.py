@@ -0,0 +1,86 @@
+"""
+Фильтрация, сортировка и выбор полей в ответах API.
+
+Фильтры и сортировка разрешены только по полям, перечисленным во ViewSet,
+чтобы каждый запрос мог использовать индекс. Параметр fields задаёт через
+запятую поля, которые нужно вернуть, остальные поля не вычисляются.
+"""
+import datetime
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.utils import timezone
+from rest_framework import filters
+from rest_framework.exceptions import ValidationError
+
+FIELDS_QUERY_PARAM = 'fields'
+
+
+def get_requested_fields(request):
+    """
+    Возвращает множество полей из параметра fields GET-запроса.
+
+    Returns:
+        set[str] | None: запрошенные поля или None, если нужно вернуть все поля.
+    """
+    if request is None or request.method not in ('GET', 'HEAD'):
+        return None
+    value = request.query_params.get(FIELDS_QUERY_PARAM)
+    if not value:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class FieldFilterBackend(filters.BaseFilterBackend):
+    """
+    Фильтрует queryset по параметрам вида поле=значение, поле__gte=значение
+    и поле__lte=значение.
+
+    Допустимые поля и операции задаются атрибутом ViewSet filter_fields,
+    например {'price': ['exact', 'gte', 'lte']}. Остальные параметры запроса
+    не учитываются, некорректное значение возвращает ошибку 400.
+    """
+    def filter_queryset(self, request, queryset, view):
+        lookups = {}
+        for name, operations in getattr(view, 'filter_fields', {}).items():
+            field = queryset.model._meta.get_field(name)
+            for operation in operations:
+                param = name if operation == 'exact' else f'{name}__{operation}'
+                if param in request.query_params:
+                    lookups[param] = self.to_python(field, param, request.query_params[param])
+        return queryset.filter(**lookups)
+
+    @staticmethod
+    def to_python(field, param, value):
+        """
+        Преобразует значение параметра к типу поля модели.
+        """
+        try:
+            value = field.to_python(value)
+        except DjangoValidationError as error:
+            raise ValidationError({param: error.messages})
+        if isinstance(value, datetime.datetime) and timezone.is_naive(value):
+            value = timezone.make_aware(value)
+        return value
+
+
+class IndexedOrderingFilter(filters.OrderingFilter):
+    """
+    Сортирует queryset по параметру ordering.
+
+    Допустимые поля задаются атрибутом ViewSet ordering_fields, по умолчанию
+    разрешена только сортировка по id. При сортировке по другому полю id
+    добавляется последним ключом, чтобы порядок был однозначным.
+    """
+    def get_valid_fields(self, queryset, view, context={}):
+        if getattr(view, 'ordering_fields', None) is None:
+            return [('id', 'id')]
+        return super().get_valid_fields(queryset, view, context)
+
+    def get_default_ordering(self, view):
+        return super().get_default_ordering(view) or ('id',)
+
+    def get_ordering(self, request, queryset, view):
+        ordering = list(super().get_ordering(request, queryset, view))
+        if not any(field.lstrip('-') == 'id' for field in ordering):
+            ordering.append('-id' if ordering[0].startswith('-') else 'id')
+        return ordering
@@ -0,0 +1,151 @@
+import asyncio
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.util import setup_testing_defaults
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.urls import reverse
+from core.asgi import application as asgi_application
+from core.wsgi import application as wsgi_application
+from app.models import Product, Lesson
+
+
+class Command(BaseCommand):
+    """
+    Сравнивает пропускную способность асинхронных представлений под ASGI
+    (core/asgi.py) и синхронных ViewSet под WSGI (core/wsgi.py) при заданном
+    количестве одновременных соединений.
+
+    Приложения вызываются в процессе напрямую, без сетевого сервера: ASGI -
+    конкурентными корутинами в одном цикле событий, WSGI - пулом потоков размером
+    --concurrency, как у многопоточного WSGI-сервера. По умолчанию кеш ответов
+    отключается, чтобы сравнивать обращения к базе данных.
+
+        python manage.py seed_data --scale 10
+        python manage.py benchmark_asgi --concurrency 50 --requests 2000
+    """
+    help = 'Сравнивает пропускную способность асинхронных (ASGI) и синхронных (WSGI) эндпоинтов чтения.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=50, help='Количество одновременных соединений.')
+        parser.add_argument('--requests', type=int, default=1000, help='Количество запросов к каждому эндпоинту.')
+        parser.add_argument('--with-cache', action='store_true', help='Не отключать кеш ответов.')
+
+    def handle(self, *args, **options):
+        product = Product.objects.order_by('pk').first()
+        lesson = Lesson.objects.order_by('pk').first()
+        if product is None or lesson is None:
+            raise CommandError('В базе нет продуктов или уроков, заполните её командой seed_data.')
+
+        endpoints = {
+            'product-list': (reverse('async-product-list'), reverse('product-list')),
+            'product-detail': (
+                reverse('async-product-detail', args=[product.pk]), reverse('product-detail', args=[product.pk])
+            ),
+            'lesson-list': (reverse('async-lesson-list'), reverse('lesson-list')),
+            'lesson-detail': (
+                reverse('async-lesson-detail', args=[lesson.pk]), reverse('lesson-detail', args=[lesson.pk])
+            ),
+        }
+        overrides = {'ALLOWED_HOSTS': ['testserver']}
+        if not options['with_cache']:
+            overrides['CACHES'] = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+        results = {}
+        with override_settings(**overrides):
+            for name, (asgi_path, wsgi_path) in endpoints.items():
+                results[name] = {
+                    'asgi': asyncio.run(self.run_asgi(asgi_path, options['concurrency'], options['requests'])),
+                    'wsgi': self.run_wsgi(wsgi_path, options['concurrency'], options['requests']),
+                }
+        self.stdout.write(json.dumps({'concurrency': options['concurrency'], 'results': results}, indent=2))
+
+    async def run_asgi(self, path, concurrency, count):
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def request():
+            async with semaphore:
+                return await self.asgi_request(path)
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(request() for _ in range(count)))
+        return self.summary(results, time.perf_counter() - started)
+
+    @staticmethod
+    async def asgi_request(path):
+        """
+        Выполняет GET-запрос к ASGI-приложению и возвращает статус и задержку.
+        """
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': b'',
+            'root_path': '',
+            'headers': [(b'host', b'testserver')],
+            'client': ('127.0.0.1', 0),
+            'server': ('testserver', 80),
+        }
+        finished = asyncio.Event()
+        request_sent = False
+        response = {}
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await finished.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+            elif message['type'] == 'http.response.body' and not message.get('more_body'):
+                finished.set()
+
+        started = time.perf_counter()
+        await asgi_application(scope, receive, send)
+        finished.set()
+        return response.get('status'), time.perf_counter() - started
+
+    def run_wsgi(self, path, concurrency, count):
+        def request(_):
+            environ = {'PATH_INFO': path, 'QUERY_STRING': '', 'HTTP_HOST': 'testserver'}
+            setup_testing_defaults(environ)
+            response = {}
+
+            def start_response(status, headers, exc_info=None):
+                response['status'] = int(status.split()[0])
+
+            started = time.perf_counter()
+            body = wsgi_application(environ, start_response)
+            for _ in body:
+                pass
+            body.close()
+            return response.get('status'), time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(request, range(count)))
+        return self.summary(results, time.perf_counter() - started)
+
+    @staticmethod
+    def summary(results, elapsed):
+        latencies = [latency * 1000 for _, latency in results]
+        percentiles = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+        return {
+            'requests': len(results),
+            'statuses': sorted({status for status, _ in results}),
+            'throughput_rps': round(len(results) / elapsed, 1),
+            'p50_ms': round(percentiles[49], 2),
+            'p95_ms': round(percentiles[94], 2),
+            'p99_ms': round(percentiles[98], 2),
+        }
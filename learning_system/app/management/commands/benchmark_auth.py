@@ -0,0 +1,94 @@
+import json
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+SESSION_MIDDLEWARE = [
+    'app.middleware.RequestMetricsMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+
+class Command(BaseCommand):
+    """
+    Сравнивает накладные расходы аутентификации запросов к API.
+
+    Режимы:
+    - session - сессия и CSRF-проверка на каждый запрос (промежуточные слои Django
+      без исключения API), как до перехода на токены;
+    - token - токен без кеша (API_TOKEN_CACHE_TIMEOUT = 0);
+    - token_cached - токен с кешем проверенных токенов (текущие настройки).
+
+    Запросы выполняются через тестовый клиент Django со всеми промежуточными
+    слоями, данные создаются в транзакции, которая откатывается.
+
+        python manage.py benchmark_auth --requests 1000
+    """
+    help = 'Сравнивает задержку и количество запросов к базе при аутентификации по сессии и токену.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Количество запросов в каждом режиме.')
+        parser.add_argument('--path', help='Адрес эндпоинта, по умолчанию /api/lessons/my/.')
+
+    def handle(self, *args, **options):
+        path = options['path'] or reverse('lesson-my')
+        results = {}
+        overrides = {'ALLOWED_HOSTS': ['testserver'], 'REQUEST_METRICS_SAMPLE_RATE': 0}
+        with transaction.atomic(), override_settings(**overrides):
+            user = User.objects.create_user(username=f'benchmark_auth_{time.time_ns()}', password='!')
+            token = Token.objects.create(user=user)
+
+            with override_settings(MIDDLEWARE=SESSION_MIDDLEWARE):
+                client = Client()
+                client.force_login(user)
+                results['session'] = self.measure(client, path, options['requests'])
+
+            with override_settings(API_TOKEN_CACHE_TIMEOUT=0):
+                client = Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+                results['token'] = self.measure(client, path, options['requests'])
+
+            client = Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+            results['token_cached'] = self.measure(client, path, options['requests'])
+            transaction.set_rollback(True)
+
+        baseline = results['session']
+        for result in results.values():
+            result['saved_queries'] = round(baseline['mean_queries'] - result['mean_queries'], 2)
+            result['saved_ms'] = round(baseline['mean_ms'] - result['mean_ms'], 3)
+        self.stdout.write(json.dumps({'path': path, 'results': results}, indent=2))
+
+    @staticmethod
+    def measure(client, path, count):
+        """
+        Выполняет count GET-запросов и возвращает задержку и количество запросов к базе.
+        """
+        client.get(path)
+        latencies = []
+        queries = []
+        statuses = set()
+        for _ in range(count):
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = client.get(path)
+                latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(len(context.captured_queries))
+            statuses.add(response.status_code)
+        return {
+            'statuses': sorted(statuses),
+            'mean_ms': round(statistics.mean(latencies), 3),
+            'p50_ms': round(statistics.median(latencies), 3),
+            'mean_queries': round(statistics.mean(queries), 2),
+        }
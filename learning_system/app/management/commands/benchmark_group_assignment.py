@@ -0,0 +1,131 @@
+import json
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from app.counters import rebuild_enrollment_rollups, rebuild_product_counters
+from app.models import Product, Group, ProductAccess
+from app.seeding import BATCH_SIZE
+
+
+class Command(BaseCommand):
+    """
+    Замеряет выбор группы и распределение ученика в продуктах с большим количеством групп.
+
+    Для каждого размера из --groups создаётся продукт с группами случайной
+    заполненности и соответствующими доступами, после чего --assignments
+    пользователей по одному распределяются в группы. Выбор наименее заполненной
+    группы по индексу (product, fill, id) сравнивается с прежним способом -
+    подсчётом учеников всех групп продукта через Count.
+
+    Данные создаются в транзакции, которая откатывается:
+
+        python manage.py benchmark_group_assignment --groups 100 1000 10000 50000
+    """
+    help = 'Замеряет выбор группы и распределение ученика в продуктах с 10 000 и более групп.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--groups', type=int, nargs='+', default=[100, 1000, 10000], help='Количество групп продукта.')
+        parser.add_argument('--assignments', type=int, default=200, help='Количество распределяемых учеников.')
+        parser.add_argument('--repeat', type=int, default=20, help='Количество повторов каждого запроса выбора.')
+        parser.add_argument('--seed', type=int, default=0, help='Начальное значение генератора случайных чисел.')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        results = {}
+        with transaction.atomic():
+            creator = User.objects.create_user(username=f'benchmark_groups_{time.time_ns()}', password='!')
+            for groups_count in options['groups']:
+                product = self.create_product(creator, groups_count, rng)
+                users = User.objects.bulk_create(
+                    [User(username=f'{product.name} student {i}', password='!') for i in range(options['assignments'])],
+                    batch_size=BATCH_SIZE,
+                )
+                selection = product.group_set.filter(fill__lt=product.max_group_size).order_by('fill', 'pk')[:1]
+                count_scan = product.group_set.annotate(users_count=Count('productaccess')).order_by('pk')
+                results[groups_count] = {
+                    'selection_ms': self.measure(selection, options['repeat']),
+                    'count_scan_ms': self.measure(count_scan, options['repeat']),
+                    'assignment': self.measure_assignments(product, users),
+                    'selection_plan': selection.explain(),
+                }
+            transaction.set_rollback(True)
+        self.stdout.write(json.dumps(results, ensure_ascii=False, indent=2))
+
+    @staticmethod
+    def create_product(creator, groups_count, rng):
+        """
+        Создаёт продукт с groups_count группами случайной заполненности и их доступами.
+
+        Группы и доступы создаются через bulk_create без сигналов, поэтому затем
+        счётчики продукта и дневные количества записей пересчитываются, как в seed_data.
+        """
+        product = Product.objects.create(
+            creator=creator,
+            name=f'benchmark {groups_count} groups',
+            start_date=timezone.now(),
+            price=100,
+        )
+        fills = [rng.randint(1, product.max_group_size) for _ in range(groups_count)]
+        groups = Group.objects.bulk_create(
+            [Group(product=product, name=f'{product.name} #{i + 1}', fill=fill) for i, fill in enumerate(fills)],
+            batch_size=BATCH_SIZE,
+        )
+        users = User.objects.bulk_create(
+            [User(username=f'{product.name} member {i}', password='!') for i in range(sum(fills))],
+            batch_size=BATCH_SIZE,
+        )
+        members = iter(users)
+        ProductAccess.objects.bulk_create(
+            [
+                ProductAccess(user=next(members), product=product, group=group)
+                for group in groups
+                for _ in range(group.fill)
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        products = Product.objects.filter(pk=product.pk)
+        rebuild_product_counters(products)
+        rebuild_enrollment_rollups(products)
+        product.refresh_from_db()
+        if connection.vendor in ('postgresql', 'sqlite'):
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        return product
+
+    @staticmethod
+    def measure(queryset, repeat):
+        """
+        Возвращает медианное время выполнения запроса в миллисекундах.
+        """
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(queryset.all())
+            timings.append((time.perf_counter() - started) * 1000)
+        return round(statistics.median(timings), 3)
+
+    @staticmethod
+    def measure_assignments(product, users):
+        """
+        Распределяет пользователей по одному и возвращает задержку и количество запросов к базе.
+        """
+        latencies = []
+        queries = []
+        for user in users:
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                product.assign_user_to_group(user)
+                latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(len(context.captured_queries))
+        return {
+            'p50_ms': round(statistics.median(latencies), 3),
+            'max_ms': round(max(latencies), 3),
+            'mean_queries': round(statistics.mean(queries), 2),
+        }
@@ -0,0 +1,116 @@
+import json
+import math
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from app.models import Product, Group, ProductAccess
+from app.seeding import seed_database
+
+# Columns that already exist at migration 0002, so the "before" run works on the current models.
+PRODUCT_COLUMNS = ('id', 'creator_id', 'name', 'start_date', 'price', 'students_count', 'average_group_filling')
+GROUP_COLUMNS = ('id', 'product_id', 'name')
+ACCESS_COLUMNS = ('id', 'user_id', 'product_id', 'group_id')
+
+
+class Command(BaseCommand):
+    """
+    Показывает планы и время горячих запросов к ProductAccess, Group и Product.
+
+    Сравнение до и после миграции 0003_access_group_indexes:
+
+        python manage.py benchmark_indexes --seed --accesses 1000000
+        python manage.py migrate app 0002
+        python manage.py benchmark_indexes --output before.json
+        python manage.py migrate app
+        python manage.py benchmark_indexes --output after.json --compare before.json
+
+    Команда заполняет и читает базу данных из настроек, запускать её нужно
+    только на отдельной базе для замеров. Запросы читают только столбцы,
+    существующие на миграции 0002, поэтому замер "до" работает с текущими моделями.
+    """
+    help = 'Показывает планы и время горячих запросов к ProductAccess, Group и Product.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', action='store_true', help='Заполнить базу данными для замеров.')
+        parser.add_argument('--accesses', type=int, default=1000000, help='Количество строк ProductAccess.')
+        parser.add_argument('--repeat', type=int, default=20, help='Количество повторов каждого запроса.')
+        parser.add_argument('--output', help='Сохранить результаты в JSON-файл.')
+        parser.add_argument('--compare', help='JSON-файл предыдущего запуска для сравнения.')
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            self.seed(options['accesses'])
+
+        product_id = Product.objects.order_by('pk').values_list('pk', flat=True).last()
+        accesses = ProductAccess.objects.filter(product_id=product_id).exclude(group=None)
+        access = accesses.order_by('pk').values(*ACCESS_COLUMNS).last()
+        if access is None:
+            self.stderr.write('В базе нет доступов к продуктам, запустите команду с --seed.')
+            return
+
+        results = {}
+        for name, queryset in self.queries(access).items():
+            results[name] = {
+                'plan': queryset.explain(),
+                'median_ms': self.measure(queryset, options['repeat']),
+            }
+
+        previous = {}
+        if options['compare']:
+            with open(options['compare']) as file:
+                previous = json.load(file)
+        for name, result in results.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            if name in previous:
+                self.stdout.write(f'  до: {previous[name]["median_ms"]:.3f} мс')
+                self.stdout.write('    ' + previous[name]['plan'].replace('\n', '\n    '))
+                self.stdout.write(f'  после: {result["median_ms"]:.3f} мс')
+            else:
+                self.stdout.write(f'  {result["median_ms"]:.3f} мс')
+            self.stdout.write('    ' + result['plan'].replace('\n', '\n    '))
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(results, file, ensure_ascii=False, indent=2)
+
+    def queries(self, access):
+        """
+        Возвращает горячие запросы, для которых добавлены индексы.
+        """
+        return {
+            'ProductAccess по (product, user)': ProductAccess.objects.filter(
+                product_id=access['product_id'], user_id=access['user_id']
+            ).values(*ACCESS_COLUMNS),
+            'ProductAccess по (product, group)': ProductAccess.objects.filter(
+                product_id=access['product_id'], group_id=access['group_id']
+            ).values(*ACCESS_COLUMNS),
+            'Group по product': Group.objects.filter(product_id=access['product_id']).order_by('id').values(*GROUP_COLUMNS),
+            'Product по start_date': Product.objects.order_by('start_date').values(*PRODUCT_COLUMNS)[:100],
+        }
+
+    @staticmethod
+    def measure(queryset, repeat):
+        """
+        Возвращает медианное время выполнения запроса в миллисекундах.
+        """
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(queryset.all())
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
+
+    def seed(self, accesses):
+        """
+        Заполняет базу пользователями, продуктами, группами и доступами.
+
+        Каждый пользователь получает доступ ко всем продуктам, поэтому количество
+        пользователей и продуктов примерно равно квадратному корню из accesses.
+        """
+        products_count = max(int(math.sqrt(accesses)), 1)
+        users_count = math.ceil(accesses / products_count)
+        created = seed_database(users_count, products_count, users_count, prefix='bench')
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано {created["accesses"]} доступов к {created["products"]} продуктам.'
+        ))
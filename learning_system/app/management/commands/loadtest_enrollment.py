@@ -0,0 +1,92 @@
+import json
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, OperationalError
+from django.utils import timezone
+from app.models import Product, Counter
+
+
+class Command(BaseCommand):
+    """
+    Нагрузочный тест записи на пути распределения учеников в группы.
+
+    Несколько потоков параллельно вызывают Product.assign_user_to_group для
+    разных продуктов, каждый поток работает в своём соединении с базой данных.
+    Чтобы сравнить профили, команду запускают с разными переменными окружения:
+
+        SQLITE_TUNING=0 python manage.py loadtest_enrollment
+        python manage.py loadtest_enrollment
+        DATABASE_PROFILE=postgresql python manage.py loadtest_enrollment
+
+    Команда создаёт данные в базе из настроек, запускать её нужно только
+    на отдельной базе для замеров.
+    """
+    help = 'Измеряет пропускную способность записи при распределении учеников в группы.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Количество параллельных потоков.')
+        parser.add_argument('--enrollments', type=int, default=2000, help='Общее количество распределений.')
+        parser.add_argument('--products', type=int, default=4, help='Количество продуктов.')
+
+    def handle(self, *args, **options):
+        threads_count = options['threads']
+        enrollments = options['enrollments']
+        run_id = int(time.time() * 1000)
+        creator = User.objects.create(username=f'loadtest_{run_id}', password='!')
+        products = Product.objects.bulk_create([
+            Product(
+                creator=creator,
+                name=f'Load test {run_id} #{i}',
+                start_date=timezone.now() + timedelta(days=1),
+                price=100,
+            )
+            for i in range(options['products'])
+        ])
+        users = User.objects.bulk_create([
+            User(username=f'loadtest_{run_id}_{i}', password='!') for i in range(enrollments)
+        ])
+        Counter.reconcile(Counter.USERS)
+        connection.close()
+
+        errors = []
+        latencies = []
+
+        def worker(index):
+            try:
+                for i in range(index, enrollments, threads_count):
+                    started = time.perf_counter()
+                    try:
+                        products[i % len(products)].assign_user_to_group(users[i])
+                    except OperationalError as error:
+                        errors.append(str(error))
+                        continue
+                    latencies.append(time.perf_counter() - started)
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads_count)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        result = {
+            'profile': settings.DATABASE_PROFILE,
+            'sqlite_pragmas': settings.SQLITE_PRAGMAS if settings.DATABASE_PROFILE == 'sqlite' else None,
+            'threads': threads_count,
+            'enrollments': len(latencies),
+            'errors': len(errors),
+            'seconds': round(elapsed, 3),
+            'enrollments_per_second': round(len(latencies) / elapsed, 1),
+            'p50_ms': round(latencies[len(latencies) // 2] * 1000, 2) if latencies else None,
+            'p95_ms': round(latencies[int(len(latencies) * 0.95)] * 1000, 2) if latencies else None,
+        }
+        self.stdout.write(json.dumps(result, ensure_ascii=False))
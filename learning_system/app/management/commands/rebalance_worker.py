@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+from app.models import RebalanceJob
+
+
+class Command(BaseCommand):
+    """
+    Фоновый обработчик задач перераспределения учеников между группами.
+
+    Задачи ставит Product.assign_users_to_groups при создании новых групп.
+    Обработчик выполняет их пачками по --limit продуктов и ждёт --interval
+    секунд, когда задач нет. С флагом --once команда выполняет все задачи
+    и завершается, что удобно для запуска из cron.
+
+        python manage.py rebalance_worker --interval 5
+    """
+    help = 'Выполняет задачи перераспределения учеников между группами.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Выполнить все задачи и завершиться.')
+        parser.add_argument('--interval', type=float, default=5.0, help='Пауза в секундах, когда задач нет.')
+        parser.add_argument('--limit', type=int, default=100, help='Количество продуктов за один проход.')
+
+    def handle(self, *args, **options):
+        while True:
+            processed = RebalanceJob.process_pending(options['limit'])
+            if processed:
+                self.stdout.write(f'Перераспределено продуктов: {processed}')
+                continue
+            if options['once']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from app.counters import (
+    rebuild_enrollment_rollups, rebuild_group_fill, rebuild_product_counters, rebuild_signup_rollups,
+)
+
+
+class Command(BaseCommand):
+    """
+    Пересчитывает students_count и average_group_filling всех продуктов,
+    заполнение групп, дневные количества записей на продукты и регистраций пользователей.
+    """
+    help = 'Пересчитывает счётчики students_count и average_group_filling, заполнение групп, дневные количества записей всех продуктов и регистраций пользователей.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            updated = rebuild_product_counters()
+            groups = rebuild_group_fill()
+            rollups = rebuild_enrollment_rollups()
+            signups = rebuild_signup_rollups()
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитаны счётчики {updated} продуктов, {groups} групп, {rollups} дневных количеств записей '
+            f'и {signups} дневных количеств регистраций.'
+        ))
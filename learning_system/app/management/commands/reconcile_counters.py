@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from app.models import Counter
+
+
+class Command(BaseCommand):
+    """
+    Сверяет поддерживаемые счётчики с данными и исправляет расхождения.
+
+    Команду рекомендуется запускать периодически (например, из cron), чтобы
+    исправлять расхождения после массовых операций без сигналов.
+    """
+    help = 'Сверяет поддерживаемые счётчики с данными и исправляет расхождения.'
+
+    def handle(self, *args, **options):
+        for name in (Counter.USERS,):
+            previous = Counter.objects.filter(name=name).values_list('value', flat=True).first()
+            value = Counter.reconcile(name)
+            self.stdout.write(f'{name}: {previous} -> {value}')
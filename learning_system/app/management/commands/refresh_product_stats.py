@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from app.models import Product
+from app.stats import mark_dirty, refresh_product_stats
+
+
+class Command(BaseCommand):
+    """
+    Пересчитывает статистику продуктов, данные которых изменились с прошлого запуска.
+
+    Команду рекомендуется запускать периодически (например, из cron). С флагом
+    --all статистика пересчитывается для всех продуктов.
+    """
+    help = 'Пересчитывает статистику изменённых продуктов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Пересчитать статистику всех продуктов.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Количество продуктов за один пересчёт.')
+
+    def handle(self, *args, **options):
+        if options['all']:
+            mark_dirty(Product.objects.values_list('pk', flat=True))
+        refreshed = 0
+        while True:
+            count = refresh_product_stats(options['batch_size'])
+            refreshed += count
+            if count < options['batch_size']:
+                break
+        self.stdout.write(self.style.SUCCESS(f'Пересчитана статистика {refreshed} продуктов.'))
@@ -0,0 +1,163 @@
+import json
+import platform
+import random
+import statistics
+import subprocess
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from app.models import Product, ProductAccess
+from app.urls import router
+
+
+class Command(BaseCommand):
+    """
+    Замеряет задержку, количество запросов к базе и пропускную способность
+    эндпоинтов API и Product.assign_user_to_group.
+
+    Для каждого эндпоинта роутера (list, detail и GET-действия) выполняется
+    --requests запросов от имени пользователя с доступами к продуктам.
+    Результаты выводятся в JSON, чтобы сравнивать запуски на разных коммитах:
+
+        python manage.py seed_data --scale 10
+        python manage.py run_benchmarks --output before.json
+
+    Распределение в группы выполняется в транзакции, которая откатывается.
+    """
+    help = 'Замеряет задержку, количество запросов и пропускную способность эндпоинтов API.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100, help='Количество запросов к каждому эндпоинту.')
+        parser.add_argument('--assignments', type=int, default=100, help='Количество распределений в группы.')
+        parser.add_argument('--cold', action='store_true', help='Очищать кеш перед каждым запросом.')
+        parser.add_argument('--seed', type=int, default=0, help='Начальное значение генератора случайных чисел.')
+        parser.add_argument('--output', help='Файл для результатов, по умолчанию стандартный вывод.')
+
+    def handle(self, *args, **options):
+        access = ProductAccess.objects.order_by('?').first()
+        if access is None:
+            raise CommandError('В базе нет доступов к продуктам, заполните её командой seed_data.')
+        self.rng = random.Random(options['seed'])
+        self.cold = options['cold']
+
+        client = APIClient()
+        client.force_authenticate(user=access.user)
+        results = {}
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            for name, urls in self.endpoints().items():
+                results[name] = self.measure(lambda: client.get(self.rng.choice(urls)), options['requests'])
+        results['assign_user_to_group'] = self.measure_assignments(options['assignments'])
+
+        report = {
+            'meta': {
+                'commit': self.git_commit(),
+                'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'python': platform.python_version(),
+                'database': connection.vendor,
+                'database_profile': getattr(settings, 'DATABASE_PROFILE', None),
+                'cold_cache': self.cold,
+                'rows': {
+                    model._meta.label: model.objects.count()
+                    for model in [User] + [viewset.queryset.model for _, viewset, _ in router.registry]
+                },
+            },
+            'results': results,
+        }
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
+
+    def endpoints(self):
+        """
+        Возвращает адреса GET-эндпоинтов роутера.
+
+        Для detail-эндпоинтов берётся до 20 случайных объектов.
+        """
+        endpoints = {}
+        for _, viewset, basename in router.registry:
+            pks = list(viewset.queryset.model.objects.order_by('?').values_list('pk', flat=True)[:20])
+            endpoints[f'{basename}-list'] = [reverse(f'{basename}-list')]
+            if pks:
+                endpoints[f'{basename}-detail'] = [reverse(f'{basename}-detail', args=[pk]) for pk in pks]
+            for extra_action in viewset.get_extra_actions():
+                if 'get' not in extra_action.mapping:
+                    continue
+                name = f'{basename}-{extra_action.url_name}'
+                if extra_action.detail:
+                    if pks:
+                        endpoints[name] = [reverse(name, args=[pk]) for pk in pks]
+                else:
+                    endpoints[name] = [reverse(name)]
+        return endpoints
+
+    def measure(self, call, count):
+        """
+        Выполняет call count раз и возвращает статистику задержки и запросов к базе.
+
+        Потоковые ответы (экспорт) читаются целиком внутри замера, иначе
+        запросы и время генерации тела ответа не попадают в статистику.
+        """
+        latencies = []
+        queries = []
+        statuses = set()
+        started = time.perf_counter()
+        for _ in range(count):
+            if self.cold:
+                cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                request_started = time.perf_counter()
+                response = call()
+                if getattr(response, 'streaming', False):
+                    for _ in response.streaming_content:
+                        pass
+                latencies.append((time.perf_counter() - request_started) * 1000)
+            queries.append(len(context.captured_queries))
+            if hasattr(response, 'status_code'):
+                statuses.add(response.status_code)
+        elapsed = time.perf_counter() - started
+        percentiles = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+        return {
+            'count': count,
+            'p50_ms': round(percentiles[49], 3),
+            'p95_ms': round(percentiles[94], 3),
+            'p99_ms': round(percentiles[98], 3),
+            'mean_queries': round(statistics.mean(queries), 2),
+            'max_queries': max(queries),
+            'throughput_rps': round(count / elapsed, 1),
+            'statuses': sorted(statuses),
+        }
+
+    def measure_assignments(self, count):
+        """
+        Замеряет Product.assign_user_to_group для новых пользователей и откатывает изменения.
+        """
+        products = list(Product.objects.order_by('?')[:20])
+        with transaction.atomic():
+            users = iter(User.objects.bulk_create([
+                User(username=f'benchmark_{time.time_ns()}_{i}', password='!') for i in range(count)
+            ]))
+            result = self.measure(lambda: self.rng.choice(products).assign_user_to_group(next(users)), count)
+            transaction.set_rollback(True)
+        return result
+
+    @staticmethod
+    def git_commit():
+        """
+        Возвращает хеш текущего коммита или None, если он недоступен.
+        """
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,41 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from app.seeding import seed_database
+
+
+class Command(BaseCommand):
+    """
+    Заполняет базу данными для замеров производительности.
+
+    При масштабе 1 создаётся 1000 пользователей и 50 продуктов по 10 уроков,
+    к каждому продукту доступ получает 20% пользователей. Все объёмы
+    пропорциональны --scale.
+    """
+    help = 'Заполняет базу пользователями, продуктами, группами, уроками и доступами для замеров.'
+
+    users_per_scale = 1000
+    products_per_scale = 50
+    lessons_per_product = 10
+    access_ratio = 0.2
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1, help='Множитель объёма данных.')
+        parser.add_argument('--seed', type=int, default=0, help='Начальное значение генератора случайных чисел.')
+        parser.add_argument('--prefix', default=None, help='Префикс имён создаваемых объектов.')
+
+    def handle(self, *args, **options):
+        scale = options['scale']
+        users_count = max(int(self.users_per_scale * scale), 1)
+        started = time.perf_counter()
+        created = seed_database(
+            users_count=users_count,
+            products_count=max(int(self.products_per_scale * scale), 1),
+            accesses_per_product=max(int(users_count * self.access_ratio), 1),
+            lessons_per_product=self.lessons_per_product,
+            seed=options['seed'],
+            prefix=options['prefix'] or f'seed{int(time.time())}',
+        )
+        created['seconds'] = round(time.perf_counter() - started, 2)
+        self.stdout.write(json.dumps(created))
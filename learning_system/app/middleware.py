@@ -0,0 +1,300 @@
+"""
+Промежуточные слои (middleware) приложения.
+"""
+import json
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.messages.middleware import MessageMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.db import connections
+from django.middleware.csrf import CsrfViewMiddleware
+
+logger = logging.getLogger('app.requests')
+
+_current_metrics = ContextVar('request_metrics', default=None)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*(?:\?|%s)\s*,?)+\)', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """
+    Возвращает SQL-запрос без литералов, чтобы одинаковые запросы с разными
+    параметрами давали одну и ту же строку.
+    """
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+class RequestMetrics:
+    """
+    Метрики одного запроса.
+
+    Атрибуты:
+    - sql_count (int): количество SQL-запросов;
+    - sql_time (float): суммарное время SQL-запросов в секундах;
+    - started (float): время начала обработки запроса по time.perf_counter;
+    - total_time (float): общее время обработки запроса в секундах;
+    - timings (dict): время именованных участков обработки в секундах;
+    - fingerprints (Counter): количество выполнений каждого SQL-запроса без литералов.
+    """
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.started = time.perf_counter()
+        self.total_time = 0.0
+        self.timings = {}
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        """
+        Обёртка выполнения SQL для connection.execute_wrapper.
+        """
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            self.sql_count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def repeated(self, limit=5):
+        """
+        Возвращает самые частые SQL-запросы, выполненные больше одного раза.
+        """
+        return [
+            {'fingerprint': sql, 'count': count}
+            for sql, count in self.fingerprints.most_common(limit)
+            if count > 1
+        ]
+
+
+@contextmanager
+def timed(name):
+    """
+    Добавляет время выполнения блока к метрике name текущего запроса.
+
+    Если метрики для запроса не собираются, блок выполняется без замеров.
+    """
+    metrics = _current_metrics.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.timings[name] = metrics.timings.get(name, 0.0) + time.perf_counter() - started
+
+
+class RequestMetricsMiddleware:
+    """
+    Собирает количество и время SQL-запросов, время сериализации и общее время
+    обработки запроса.
+
+    Метрики возвращаются в заголовке Server-Timing и записываются одной
+    JSON-строкой в логгер app.requests. Метрики собираются для доли запросов,
+    заданной настройкой REQUEST_METRICS_SAMPLE_RATE (от 0 до 1), остальные
+    запросы обрабатываются без накладных расходов. Поддерживает синхронный
+    и асинхронный режимы, чтобы не переводить асинхронные представления в поток.
+
+    Тело потокового ответа (например, выгрузки) формируется и читает базу уже
+    после выхода из промежуточного слоя, поэтому для таких ответов сбор
+    метрик продолжается до конца или закрытия потока, а затем метрики
+    записываются в лог. Заголовок Server-Timing им не добавляется: к этому
+    моменту заголовки уже отправлены.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+        with self.measure() as metrics, self.wrap_connections(metrics) as wrappers:
+            response = self.get_response(request)
+            if self.is_sync_stream(response):
+                return self.measure_stream(request, response, metrics, wrappers.pop_all())
+        return self.report(request, response, metrics)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+        with self.measure() as metrics:
+            # Соединения с базой у каждого потока свои, а асинхронные методы ORM
+            # выполняются в потоке sync_to_async, поэтому обёртка подключается там.
+            wrappers = await sync_to_async(self.wrap_connections)(metrics)
+            try:
+                response = await self.get_response(request)
+                if self.is_sync_stream(response):
+                    # Синхронный поток читается в том же потоке sync_to_async,
+                    # поэтому обёртки отключаются там после его чтения.
+                    return self.measure_stream(request, response, metrics, wrappers.pop_all())
+            finally:
+                await sync_to_async(wrappers.close)()
+        return self.report(request, response, metrics)
+
+    @staticmethod
+    def sampled():
+        sample_rate = settings.REQUEST_METRICS_SAMPLE_RATE
+        return sample_rate >= 1 or (sample_rate > 0 and random.random() < sample_rate)
+
+    @contextmanager
+    def measure(self):
+        """
+        Создаёт метрики текущего запроса и замеряет общее время его обработки.
+        """
+        metrics = RequestMetrics()
+        token = _current_metrics.set(metrics)
+        try:
+            yield metrics
+        finally:
+            metrics.total_time = time.perf_counter() - metrics.started
+            _current_metrics.reset(token)
+
+    @staticmethod
+    def wrap_connections(metrics):
+        """
+        Подключает сбор метрик к соединениям с базой данных текущего потока.
+
+        Returns:
+            ExitStack: контекст, при закрытии которого обёртки отключаются.
+        """
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(metrics))
+        return stack
+
+    @staticmethod
+    def is_sync_stream(response):
+        return getattr(response, 'streaming', False) and not getattr(response, 'is_async', False)
+
+    def measure_stream(self, request, response, metrics, wrappers):
+        """
+        Продолжает сбор метрик, пока читается тело потокового ответа.
+
+        Args:
+            request (HttpRequest): запрос.
+            response (StreamingHttpResponse): ответ с синхронным потоком.
+            metrics (RequestMetrics): метрики запроса.
+            wrappers (ExitStack): подключённые к соединениям обёртки, отключаются в конце потока.
+
+        Returns:
+            StreamingHttpResponse: тот же ответ, поток которого записывает метрики в лог.
+        """
+        content = response.streaming_content
+
+        def stream():
+            try:
+                yield from content
+            finally:
+                wrappers.close()
+                metrics.total_time = time.perf_counter() - metrics.started
+                self.log(request, response, metrics)
+
+        response.streaming_content = stream()
+        return response
+
+    @classmethod
+    def report(cls, request, response, metrics):
+        """
+        Добавляет к ответу заголовок Server-Timing и записывает метрики в лог.
+        """
+        server_timing = [f'sql;dur={metrics.sql_time * 1000:.2f};desc="{metrics.sql_count} queries"']
+        server_timing += [f'{name};dur={value * 1000:.2f}' for name, value in metrics.timings.items()]
+        server_timing.append(f'total;dur={metrics.total_time * 1000:.2f}')
+        response['Server-Timing'] = ', '.join(server_timing)
+        cls.log(request, response, metrics)
+        return response
+
+    @staticmethod
+    def log(request, response, metrics):
+        """
+        Записывает метрики запроса одной JSON-строкой в логгер app.requests.
+        """
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(metrics.total_time * 1000, 2),
+            'sql_count': metrics.sql_count,
+            'sql_ms': round(metrics.sql_time * 1000, 2),
+            **{f'{name}_ms': round(value * 1000, 2) for name, value in metrics.timings.items()},
+            'repeated_sql': metrics.repeated(),
+        }, ensure_ascii=False))
+
+
+def is_api_request(request):
+    """
+    Возвращает True для запросов к API (путь начинается с API_PATH_PREFIX).
+    """
+    return request.path_info.startswith(settings.API_PATH_PREFIX)
+
+
+class SkipApiMiddlewareMixin:
+    """
+    Примесь, отключающая промежуточный слой для запросов к API.
+
+    API аутентифицируется по токену, поэтому сессии, CSRF-защита и сообщения
+    нужны только админке и не должны читать cookie и обращаться к базе данных
+    при каждом запросе к API.
+    """
+    def process_request(self, request):
+        if is_api_request(request) or not hasattr(super(), 'process_request'):
+            return None
+        return super().process_request(request)
+
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        if is_api_request(request) or not hasattr(super(), 'process_view'):
+            return None
+        return super().process_view(request, callback, callback_args, callback_kwargs)
+
+    def process_response(self, request, response):
+        if is_api_request(request) or not hasattr(super(), 'process_response'):
+            return response
+        return super().process_response(request, response)
+
+
+class SiteSessionMiddleware(SkipApiMiddlewareMixin, SessionMiddleware):
+    """
+    SessionMiddleware, не загружающий сессию для запросов к API.
+    """
+
+
+class SiteCsrfViewMiddleware(SkipApiMiddlewareMixin, CsrfViewMiddleware):
+    """
+    CsrfViewMiddleware, не проверяющий запросы к API.
+    """
+
+
+class SiteAuthenticationMiddleware(SkipApiMiddlewareMixin, AuthenticationMiddleware):
+    """
+    AuthenticationMiddleware, не определяющий пользователя по сессии для запросов
+    к API: пользователя API определяет аутентификация DRF.
+    """
+
+
+class SiteMessageMiddleware(SkipApiMiddlewareMixin, MessageMiddleware):
+    """
+    MessageMiddleware, не подключающий хранилище сообщений для запросов к API.
+    """
@@ -0,0 +1,60 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:01
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_accesses(apps, schema_editor):
+    """
+    Удаляет повторные доступы пользователя к продукту, оставляя самый ранний,
+    и пересчитывает количество учеников затронутых продуктов.
+
+    После миграции среднее заполнение групп можно уточнить командой
+    rebuild_product_counters.
+    """
+    ProductAccess = apps.get_model('app', 'ProductAccess')
+    Product = apps.get_model('app', 'Product')
+    duplicates = (
+        ProductAccess.objects.values('product', 'user')
+        .annotate(first_id=Min('id'), count=Count('id'))
+        .filter(count__gt=1)
+    )
+    product_ids = set()
+    for duplicate in duplicates.iterator():
+        ProductAccess.objects.filter(product=duplicate['product'], user=duplicate['user']).exclude(
+            id=duplicate['first_id']
+        ).delete()
+        product_ids.add(duplicate['product'])
+    for product_id in product_ids:
+        Product.objects.filter(pk=product_id).update(
+            students_count=ProductAccess.objects.filter(product=product_id).count()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_product_average_group_filling_product_students_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(fields=['product', 'id'], name='app_group_product_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['start_date'], name='app_product_start_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productaccess',
+            index=models.Index(fields=['product', 'group'], name='app_access_product_group_idx'),
+        ),
+        migrations.RunPython(remove_duplicate_accesses, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='productaccess',
+            constraint=models.UniqueConstraint(fields=('product', 'user'), name='app_productaccess_product_user_uniq'),
+        ),
+    ]
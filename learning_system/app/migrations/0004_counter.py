@@ -0,0 +1,32 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_user_counter(apps, schema_editor):
+    """
+    Создаёт счётчик пользователей с текущим количеством пользователей.
+    """
+    Counter = apps.get_model('app', 'Counter')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Counter.objects.update_or_create(name='users', defaults={'value': User.objects.count()})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_access_group_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Counter',
+            fields=[
+                ('name', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_user_counter, migrations.RunPython.noop),
+    ]
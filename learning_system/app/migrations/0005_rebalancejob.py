@@ -0,0 +1,22 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_counter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RebalanceJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rebalance_jobs', to='app.product')),
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_rebalancejob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['product', 'id'], name='app_lesson_product_id_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def mark_products_dirty(apps, schema_editor):
+    """
+    Отмечает все существующие продукты для первого пересчёта статистики.
+    """
+    Product = apps.get_model('app', 'Product')
+    DirtyProduct = apps.get_model('app', 'DirtyProduct')
+    now = timezone.now()
+    DirtyProduct.objects.bulk_create(
+        [DirtyProduct(product_id=pk, marked_at=now) for pk in Product.objects.values_list('pk', flat=True)],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_product_price_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirtyProduct',
+            fields=[
+                ('product_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('marked_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProductStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('students_count', models.IntegerField(default=0)),
+                ('groups_count', models.IntegerField(default=0)),
+                ('average_group_filling', models.FloatField(default=0.0)),
+                ('lessons_count', models.IntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField()),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='app.product')),
+            ],
+        ),
+        migrations.RunPython(mark_products_dirty, migrations.RunPython.noop),
+    ]
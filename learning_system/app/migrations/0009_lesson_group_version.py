@@ -0,0 +1,23 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_productstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:34
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def build_enrollment_rollups(apps, schema_editor):
+    """
+    Заполняет дневные количества записей по существующим доступам.
+
+    Существующие доступы получают время применения миграции, поэтому попадают в текущий день.
+    """
+    ProductAccess = apps.get_model('app', 'ProductAccess')
+    EnrollmentRollup = apps.get_model('app', 'EnrollmentRollup')
+    rows = ProductAccess.objects.annotate(day=TruncDate('created_at')).order_by().values('product_id', 'day').annotate(
+        count=Count('pk')
+    )
+    EnrollmentRollup.objects.bulk_create(
+        [EnrollmentRollup(product_id=row['product_id'], day=row['day'], count=row['count']) for row in rows],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_lesson_group_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnrollmentRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='productaccess',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='productaccess',
+            index=models.Index(fields=['product', 'created_at'], name='app_access_product_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='enrollmentrollup',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enrollment_rollups', to='app.product'),
+        ),
+        migrations.AddConstraint(
+            model_name='enrollmentrollup',
+            constraint=models.UniqueConstraint(fields=('product', 'day'), name='app_enrollmentrollup_product_day_uniq'),
+        ),
+        migrations.RunPython(build_enrollment_rollups, migrations.RunPython.noop),
+    ]
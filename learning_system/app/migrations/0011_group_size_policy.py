@@ -0,0 +1,54 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:46
+
+import django.core.validators
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def build_group_fill(apps, schema_editor):
+    """
+    Заполняет счётчики учеников групп по существующим доступам.
+    """
+    Group = apps.get_model('app', 'Group')
+    ProductAccess = apps.get_model('app', 'ProductAccess')
+    counts = ProductAccess.objects.filter(group=OuterRef('pk')).order_by().values('group').annotate(
+        count=Count('pk')
+    ).values('count')
+    Group.objects.update(fill=Coalesce(Subquery(counts, output_field=IntegerField()), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_enrollment_rollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='fill',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='max_group_size',
+            field=models.PositiveIntegerField(default=5, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='min_group_size',
+            field=models.PositiveIntegerField(default=2),
+        ),
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(fields=['product', 'fill', 'id'], name='app_group_product_fill_idx'),
+        ),
+        migrations.RunPython(build_group_fill, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='product',
+            constraint=models.CheckConstraint(check=models.Q(('max_group_size__gte', 1), ('min_group_size__lte', models.F('max_group_size'))), name='app_product_group_size_check'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.2 on 2026-10-18 09:16
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def build_groups_count(apps, schema_editor):
+    """
+    Заполняет количество групп продуктов по существующим группам.
+    """
+    Product = apps.get_model('app', 'Product')
+    Group = apps.get_model('app', 'Group')
+    counts = Group.objects.filter(product=OuterRef('pk')).order_by().values('product').annotate(
+        count=Count('pk')
+    ).values('count')
+    Product.objects.update(groups_count=Coalesce(Subquery(counts, output_field=IntegerField()), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0011_group_size_policy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='groups_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(build_groups_count, migrations.RunPython.noop),
+    ]
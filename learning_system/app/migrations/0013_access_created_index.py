@@ -0,0 +1,19 @@
+# Generated by Django 5.0.2 on 2026-10-18 09:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0012_product_groups_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='productaccess',
+            index=models.Index(fields=['created_at'], name='app_access_created_idx'),
+        ),
+    ]
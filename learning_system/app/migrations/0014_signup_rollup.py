@@ -0,0 +1,39 @@
+# Generated by Django 5.0.2 on 2026-10-18 09:42
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def build_signup_rollups(apps, schema_editor):
+    """
+    Заполняет дневные количества регистраций по существующим пользователям.
+    """
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    SignupRollup = apps.get_model('app', 'SignupRollup')
+    rows = User.objects.annotate(day=TruncDate('date_joined')).order_by().values('day').annotate(count=Count('pk'))
+    SignupRollup.objects.bulk_create(
+        [SignupRollup(day=row['day'], count=row['count']) for row in rows],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0013_access_created_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SignupRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(build_signup_rollups, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,26 @@
-from django.db import models
+import heapq
+
+from asgiref.sync import sync_to_async
+from django.db import connection, models, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
+from django.core.validators import MinValueValidator
 from django.utils import timezone
 
+class ProductQuerySet(models.QuerySet):
+    """
+    Набор запросов для модели Product.
+    """
+    def with_access_count(self):
+        """
+        Добавляет к продуктам количество доступов одним сгруппированным COUNT.
+
+        Returns:
+            ProductQuerySet: продукты с аннотацией access_count.
+        """
+        return self.annotate(access_count=Count('productaccess'))
+
 class Product(models.Model):
     """
     Модель продукта.
@@ -11,16 +30,52 @@ class Product(models.Model):
     - name (models.CharField): название продукта;
     - start_date (models.DateTimeField): дата начала продукта;
     - students_count (models.IntegerField): количество учеников, занимающихся на продукте;
+    - groups_count (models.IntegerField): количество групп продукта;
     - average_group_filling (models.FloatField): среднее значение заполненности групп в процентах;
-    - price (models.DecimalField): цена продукта.
+    - price (models.DecimalField): цена продукта;
+    - max_group_size (models.PositiveIntegerField): максимальное количество учеников в группе;
+    - min_group_size (models.PositiveIntegerField): минимальное количество учеников в группе после старта продукта.
     """
     creator = models.ForeignKey(User, on_delete=models.CASCADE, related_name='products')
     name = models.CharField(max_length=255)
     start_date = models.DateTimeField()
     students_count = models.IntegerField(default=0)
+    groups_count = models.IntegerField(default=0)
     average_group_filling = models.FloatField(default=0)
     price = models.DecimalField(max_digits=10, decimal_places=2)
-    
+    max_group_size = models.PositiveIntegerField(default=5, validators=[MinValueValidator(1)])
+    min_group_size = models.PositiveIntegerField(default=2)
+
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['start_date'], name='app_product_start_date_idx'),
+            models.Index(fields=['price'], name='app_product_price_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(max_group_size__gte=1, min_group_size__lte=models.F('max_group_size')),
+                name='app_product_group_size_check',
+            ),
+        ]
+
+    @staticmethod
+    def calculate_purchase_percent(access_count, total_users):
+        """
+        Вычисляет процент приобретения по готовым значениям счётчиков.
+
+        Args:
+            access_count (int): количество доступов к продукту.
+            total_users (int): общее количество пользователей.
+
+        Returns:
+            float: процент приобретения продукта, 0 если пользователей нет.
+        """
+        if not total_users:
+            return 0.0
+        return round(access_count / total_users * 100, 2)
+
     def get_purchase_percent(self):
         """
         Возвращает процент приобретения продукта.
@@ -28,9 +83,9 @@ class Product(models.Model):
         Returns:
             float: процент приобретения продукта.
         """
-        total_users = User.objects.count()
+        total_users = Counter.get_value(Counter.USERS)
         product_accesses = ProductAccess.objects.filter(product=self)
-        return round(product_accesses.count() / total_users * 100, 2)
+        return self.calculate_purchase_percent(product_accesses.count(), total_users)
     
     def assign_user_to_group(self, user):
         """
@@ -40,41 +95,245 @@ class Product(models.Model):
             user (User): пользователь, которого нужно распределить в группу.
 
         Returns:
-            None
+            ProductAccess: доступ пользователя к продукту.
         """
-        groups = self.group_set.all()
+        accesses = self.assign_users_to_groups([user])
+        if accesses:
+            return accesses[0]
+        return ProductAccess.objects.filter(product=self, user=user).first()
 
-        if not groups:
-            group = Group.objects.create(product=self)
-            ProductAccess.objects.create(user=user, product=self, group=group)
-            return
+    def assign_users_to_groups(self, users):
+        """
+        Предоставляет доступ к продукту и распределяет по группам сразу несколько пользователей.
 
-        min_count = groups.annotate(count=Count('users')).order_by('count').first().count
-        max_count = groups.annotate(count=Count('users')).order_by('-count').first().count
+        Продукт блокируется (см. lock), поэтому параллельные
+        распределения в один продукт выполняются по очереди и не переполняют группы.
+        Каждый пользователь попадает в наименее заполненную группу, в которой меньше
+        max_group_size учеников. Для n пользователей достаточно n наименее заполненных
+        неполных групп, они читаются по индексу (product, fill, id) запросом
+        ORDER BY fill LIMIT n, поэтому стоимость не зависит от количества групп
+        продукта. Если свободных мест не хватает, создаются новые группы
+        и ставится задача RebalanceJob: перераспределение учеников выполняется
+        фоновым обработчиком (см. rebalance_groups), а не во время запроса.
+        Пользователи, у которых уже есть доступ к продукту, пропускаются.
 
-        if max_count <= self.max_group_size:
-            group = groups.annotate(count=Count('users')).order_by('count').first()
-            ProductAccess.objects.create(user=user, product=self, group=group)
-            return
+        Args:
+            users (Iterable[User]): пользователи, которых нужно распределить в группы.
 
-        if self.start_date > timezone.now():
-            groups.update(users=None)
-            for user in self.users.all():
-                self.assign_user_to_group(user)
-            self.assign_user_to_group(user)
-            return
+        Returns:
+            list[ProductAccess]: созданные доступы к продукту.
+        """
+        from . import cache, counters, stats
+
+        with transaction.atomic():
+            self.lock()
+            users = list({user.pk: user for user in users}.values())
+            enrolled = set(
+                ProductAccess.objects.filter(product=self, user__in=users).values_list('user_id', flat=True)
+            )
+            users = [user for user in users if user.pk not in enrolled]
+            if not users:
+                return []
+
+            free_groups = self.group_set.filter(fill__lt=self.max_group_size).order_by('fill', 'pk')
+            groups = list(free_groups.only('pk', 'product_id', 'fill')[:len(users)])
+            free_places = sum(self.max_group_size - group.fill for group in groups)
+            if len(users) > free_places:
+                new_groups = self._create_groups(-(-(len(users) - free_places) // self.max_group_size))
+                groups += new_groups
+                counters.apply_group_created(self.pk, len(new_groups))
+                RebalanceJob.objects.create(product=self)
+
+            sizes = self._placement_sizes([group.fill for group in groups], len(users))
+            places = [group for group, size in zip(groups, sizes) for _ in range(size - group.fill)]
+            accesses = ProductAccess.objects.bulk_create([
+                ProductAccess(user=user, product=self, group=group) for user, group in zip(users, places)
+            ])
+            counters.apply_group_fill_deltas(
+                {group.pk: size - group.fill for group, size in zip(groups, sizes) if size > group.fill}
+            )
+            counters.apply_access_delta(self.pk, students=len(accesses), grouped=len(accesses))
+            counters.apply_enrollment_delta(self.pk, timezone.localdate(), len(accesses))
+            cache.invalidate_user_products([user.pk for user in users])
+            stats.mark_dirty([self.pk])
+            return accesses
+
+    def rebalance_groups(self):
+        """
+        Перераспределяет учеников продукта между группами.
+
+        Если групп не хватает, чтобы ни одна не превышала max_group_size
+        (например, после уменьшения max_group_size), создаются новые группы.
+        До старта продукта ученики распределяются по всем группам равномерно.
+        После старта переводится минимально необходимое число учеников: сначала
+        из переполненных групп в наименее заполненные, затем в группы, в которых
+        меньше min_group_size человек. Переводы записываются одним bulk_update.
+        """
+        from . import counters
+
+        with transaction.atomic():
+            self.lock()
+            groups = list(self.group_set.order_by('pk').only('pk', 'fill'))
+            if not groups:
+                return
+            users_count = sum(group.fill for group in groups)
+            missing = -(-users_count // self.max_group_size) - len(groups)
+            if missing > 0:
+                groups += self._create_groups(missing)
+                counters.apply_group_created(self.pk, missing)
+            if self.start_date > timezone.now():
+                sizes = self._even_sizes(users_count, len(groups))
+            else:
+                sizes = self._min_group_sizes(self._capped_sizes([group.fill for group in groups]))
+            self._move_users(groups, sizes)
+
+    def lock(self):
+        """
+        Блокирует строку продукта до конца текущей транзакции.
+
+        На базах с поддержкой SELECT ... FOR UPDATE используется select_for_update.
+        SQLite его не поддерживает, поэтому строка изменяется пустым UPDATE:
+        транзакция сразу получает блокировку записи и ожидает её с busy timeout,
+        а не завершается ошибкой "database is locked" при попытке перейти
+        от чтения к записи.
+        """
+        if connection.features.has_select_for_update:
+            Product.objects.select_for_update().get(pk=self.pk)
+        else:
+            Product.objects.filter(pk=self.pk).update(students_count=F('students_count'))
+
+    def _create_groups(self, count):
+        """
+        Создаёт пустые группы продукта одним bulk_create.
+
+        Группы нумеруются по счётчику groups_count, который читается из
+        заблокированной строки продукта, а не подсчётом групп через COUNT.
+
+        Args:
+            count (int): количество новых групп.
+
+        Returns:
+            list[Group]: созданные группы.
+        """
+        existing_count = Product.objects.filter(pk=self.pk).values_list('groups_count', flat=True).get()
+        return Group.objects.bulk_create([
+            Group(product=self, name=f'{self.name} #{existing_count + i + 1}') for i in range(count)
+        ])
+
+    @staticmethod
+    def _even_sizes(users_count, groups_count):
+        """
+        Возвращает размеры групп при равномерном распределении учеников.
+
+        Args:
+            users_count (int): количество учеников с учётом новых.
+            groups_count (int): количество групп.
 
-        users_count = self.users.count()
-        group_size = (users_count // self.max_group_size) + (1 if users_count % self.max_group_size else 0)
-        for i in range(self.max_group_size):
-            group = Group.objects.create(product=self)
-            users = self.users.all().order_by('?')[i::self.max_group_size][:group_size]
-            for user in users:
-                ProductAccess.objects.create(user=user, product=self, group=group)
-                user.groups.add(group)
-                
-    max_group_size = 5
-    min_group_size = 2
+        Returns:
+            list[int]: целевой размер каждой группы.
+        """
+        size, rest = divmod(users_count, groups_count)
+        return [size + 1 if i < rest else size for i in range(groups_count)]
+
+    def _placement_sizes(self, sizes, users_count):
+        """
+        Возвращает размеры групп после добавления каждого нового ученика
+        в наименее заполненную группу со свободными местами.
+
+        Args:
+            sizes (list[int]): текущие размеры групп.
+            users_count (int): количество новых учеников.
+
+        Returns:
+            list[int]: целевой размер каждой группы.
+        """
+        sizes = list(sizes)
+        heap = [(size, i) for i, size in enumerate(sizes) if size < self.max_group_size]
+        heapq.heapify(heap)
+        for _ in range(users_count):
+            size, i = heapq.heappop(heap)
+            sizes[i] = size + 1
+            if sizes[i] < self.max_group_size:
+                heapq.heappush(heap, (sizes[i], i))
+        return sizes
+
+    def _capped_sizes(self, sizes):
+        """
+        Возвращает размеры групп, при которых ученики групп больше max_group_size
+        переведены в наименее заполненные группы.
+
+        Args:
+            sizes (list[int]): текущие размеры групп, суммарной вместимости групп
+                должно хватать для всех учеников.
+
+        Returns:
+            list[int]: целевой размер каждой группы.
+        """
+        capped = [min(size, self.max_group_size) for size in sizes]
+        return self._placement_sizes(capped, sum(sizes) - sum(capped))
+
+    def _min_group_sizes(self, sizes):
+        """
+        Возвращает размеры групп, при которых группы меньше min_group_size
+        дополнены учениками самых заполненных групп.
+
+        Args:
+            sizes (list[int]): текущие размеры групп.
+
+        Returns:
+            list[int]: целевой размер каждой группы.
+        """
+        sizes = list(sizes)
+        small_indexes = [i for i, size in enumerate(sizes) if size < self.min_group_size]
+        donor_indexes = [i for i, size in enumerate(sizes) if size > self.min_group_size]
+        for i in sorted(small_indexes, key=lambda j: -sizes[j]):
+            while sizes[i] < self.min_group_size and donor_indexes:
+                donor = max(donor_indexes, key=lambda j: sizes[j])
+                if sizes[donor] <= self.min_group_size:
+                    break
+                sizes[donor] -= 1
+                sizes[i] += 1
+        return sizes
+
+    def _move_users(self, groups, sizes):
+        """
+        Переводит учеников между группами так, чтобы ни одна группа не превышала
+        заданный размер.
+
+        Загружаются только доступы, которые нужно перенести, изменения записываются
+        одним bulk_update. Перенесённые ученики занимают недостающие места в группах
+        по порядку, счётчики fill групп обновляются в памяти и в базе, закешированные
+        данные перенесённых учеников сбрасываются.
+
+        Args:
+            groups (list[Group]): группы продукта.
+            sizes (list[int]): целевой размер каждой группы.
+        """
+        from . import cache, counters
+
+        surplus = {group.pk: group.fill - size for group, size in zip(groups, sizes) if group.fill > size}
+        if not surplus:
+            return
+        moved = []
+        accesses = ProductAccess.objects.filter(group_id__in=surplus).only('pk', 'user_id', 'group_id').order_by('-pk')
+        for access in accesses:
+            if surplus[access.group_id]:
+                surplus[access.group_id] -= 1
+                moved.append(access)
+        by_pk = {group.pk: group for group in groups}
+        previous_fills = [group.fill for group in groups]
+        places = iter([group for group, size in zip(groups, sizes) for _ in range(max(size - group.fill, 0))])
+        for access in moved:
+            by_pk[access.group_id].fill -= 1
+            target = next(places)
+            target.fill += 1
+            access.group = target
+        ProductAccess.objects.bulk_update(moved, ['group'])
+        counters.apply_group_fill_deltas({
+            group.pk: group.fill - fill
+            for group, fill in zip(groups, previous_fills) if group.fill != fill
+        })
+        cache.invalidate_user_products(access.user_id for access in moved)
 
     def __str__(self):
         """
@@ -85,6 +344,35 @@ class Product(models.Model):
         """
         return self.name
 
+class ProductAccessQuerySet(models.QuerySet):
+    """
+    Набор запросов для модели ProductAccess.
+    """
+    def memberships(self, user_id):
+        """
+        Возвращает продукты пользователя с его группой и количеством уроков одним запросом.
+
+        Доступы соединяются с Product и Group, количество уроков считается
+        коррелированным подзапросом по индексу (product, id) урока.
+
+        Args:
+            user_id (int): идентификатор пользователя.
+
+        Returns:
+            QuerySet: словари с ключами product_id, product_name, product_start_date,
+            group_id, group_name и lessons_count, упорядоченные по продукту.
+        """
+        lessons = Lesson.objects.filter(product=OuterRef('product_id')).order_by().values('product')
+        lessons_count = Subquery(lessons.annotate(count=Count('pk')).values('count'), output_field=IntegerField())
+        return self.filter(user_id=user_id).order_by('product_id').values(
+            'product_id',
+            'group_id',
+            product_name=F('product__name'),
+            product_start_date=F('product__start_date'),
+            group_name=F('group__name'),
+            lessons_count=Coalesce(lessons_count, Value(0)),
+        )
+
 class ProductAccess(models.Model):
     """
     Модель для предоставления доступа пользователям к продукту и группе.
@@ -93,10 +381,31 @@ class ProductAccess(models.Model):
     - user (models.ForeignKey): связь с моделью User, указывает на пользователя, которому предоставлен доступ к продукту и группе.
     - product (models.ForeignKey): связь с моделью Product, указывает на продукт, к которому предоставлен доступ.
     - group (models.ForeignKey): связь с моделью Group, указывает на группу, к которой предоставлен доступ.
+    - created_at (models.DateTimeField): время предоставления доступа.
     """
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     group = models.ForeignKey('Group', on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = ProductAccessQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'user'], name='app_productaccess_product_user_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['product', 'group'], name='app_access_product_group_idx'),
+            models.Index(fields=['product', 'created_at'], name='app_access_product_created_idx'),
+            models.Index(fields=['created_at'], name='app_access_created_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        """
+        Сохраняет доступ в транзакции, в которой сигналы обновляют счётчики продукта.
+        """
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
 
     def __str__(self):
         """
@@ -111,11 +420,18 @@ class Lesson(models.Model):
     Атрибуты:
     - product (models.ForeignKey): связь с моделью Product, указывает на продукт, к которому относится урок.
     - name (models.CharField): название урока.
-    - video_link (models.URLField): ссылка на видео урока.
+    - video_link (models.URLField): ссылка на видео урока;
+    - version (models.PositiveIntegerField): номер версии, увеличивается при каждом изменении урока.
     """
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='lessons')
     name = models.CharField(max_length=255)
     video_link = models.URLField()
+    version = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'id'], name='app_lesson_product_id_idx'),
+        ]
 
     def __str__(self):
         """
@@ -131,13 +447,261 @@ class Group(models.Model):
     - product (models.ForeignKey): связь с моделью Product, указывает на продукт, к которому относится группа.
     - name (models.CharField): название группы.
     - users (models.ManyToManyField): связь многие-ко-многими с моделью User через модель ProductAccess, указывает на пользователей, которые имеют доступ к группе.
+    - version (models.PositiveIntegerField): номер версии, увеличивается при каждом изменении группы;
+    - fill (models.PositiveIntegerField): количество учеников в группе, поддерживается при изменении ProductAccess.
     """
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     name = models.CharField(max_length=255)
+    version = models.PositiveIntegerField(default=1)
+    fill = models.PositiveIntegerField(default=0)
     users = models.ManyToManyField(User, through=ProductAccess, related_name='my_groups')
-    
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'id'], name='app_group_product_id_idx'),
+            models.Index(fields=['product', 'fill', 'id'], name='app_group_product_fill_idx'),
+        ]
+
     def __str__(self):
         """
         Возвращает строковое представление объекта Group в формате "название группы".
         """
         return self.name
+
+class Counter(models.Model):
+    """
+    Модель счётчика, значение которого поддерживается при изменении данных,
+    чтобы не выполнять COUNT по большим таблицам.
+
+    Атрибуты:
+    - name (models.CharField): имя счётчика;
+    - value (models.BigIntegerField): значение счётчика.
+    """
+    USERS = 'users'
+
+    name = models.CharField(max_length=64, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    @classmethod
+    def count(cls, name):
+        """
+        Вычисляет точное значение счётчика по данным.
+
+        Args:
+            name (str): имя счётчика.
+
+        Returns:
+            int: значение счётчика.
+        """
+        if name == cls.USERS:
+            return User.objects.count()
+        raise ValueError(f'Unknown counter: {name}')
+
+    @classmethod
+    def get_value(cls, name):
+        """
+        Возвращает значение счётчика, создавая его при отсутствии.
+
+        Args:
+            name (str): имя счётчика.
+
+        Returns:
+            int: значение счётчика.
+        """
+        value = cls.objects.filter(name=name).values_list('value', flat=True).first()
+        if value is None:
+            value = cls.reconcile(name)
+        return value
+
+    @classmethod
+    async def aget_value(cls, name):
+        """
+        Асинхронная версия get_value.
+        """
+        value = await cls.objects.filter(name=name).values_list('value', flat=True).afirst()
+        if value is None:
+            value = await sync_to_async(cls.reconcile)(name)
+        return value
+
+    @classmethod
+    def increment(cls, name, delta=1):
+        """
+        Атомарно изменяет значение счётчика на delta.
+
+        Args:
+            name (str): имя счётчика.
+            delta (int): изменение значения.
+        """
+        if not cls.objects.filter(name=name).update(value=F('value') + delta):
+            cls.reconcile(name)
+
+    @classmethod
+    def reconcile(cls, name):
+        """
+        Записывает в счётчик точное значение, вычисленное по данным.
+
+        Args:
+            name (str): имя счётчика.
+
+        Returns:
+            int: значение счётчика.
+        """
+        value = cls.count(name)
+        cls.objects.update_or_create(name=name, defaults={'value': value})
+        return value
+
+    def __str__(self):
+        """
+        Возвращает строковое представление счётчика в формате "имя = значение".
+        """
+        return f'{self.name} = {self.value}'
+
+class RebalanceJob(models.Model):
+    """
+    Модель задачи на перераспределение учеников продукта между группами.
+
+    Задачи хранятся в базе данных и выполняются командой rebalance_worker,
+    поэтому внешний брокер очередей не нужен. Несколько задач одного продукта
+    выполняются одним перераспределением.
+
+    Атрибуты:
+    - product (models.ForeignKey): продукт, группы которого нужно перераспределить;
+    - created_at (models.DateTimeField): время постановки задачи.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='rebalance_jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    @classmethod
+    def process_pending(cls, limit=100):
+        """
+        Выполняет задачи не более чем limit продуктов.
+
+        Для каждого продукта под блокировкой выбираются все его задачи, группы
+        перераспределяются один раз, после чего задачи удаляются. Задачи,
+        поставленные во время перераспределения, остаются до следующего вызова.
+
+        Args:
+            limit (int): максимальное количество продуктов за вызов.
+
+        Returns:
+            int: количество перераспределённых продуктов.
+        """
+        product_ids = list(
+            cls.objects.order_by('product_id').values_list('product_id', flat=True).distinct()[:limit]
+        )
+        processed = 0
+        for product in Product.objects.filter(pk__in=product_ids):
+            with transaction.atomic():
+                product.lock()
+                job_ids = list(cls.objects.filter(product=product).values_list('pk', flat=True))
+                if not job_ids:
+                    continue
+                product.rebalance_groups()
+                cls.objects.filter(pk__in=job_ids).delete()
+                processed += 1
+        return processed
+
+    def __str__(self):
+        """
+        Возвращает строковое представление задачи в формате "продукт (время постановки)".
+        """
+        return f'{self.product_id} ({self.created_at})'
+
+class ProductStats(models.Model):
+    """
+    Модель материализованной статистики продукта.
+
+    Строки пересчитываются командой refresh_product_stats только для продуктов
+    из DirtyProduct, поэтому отчёты читают готовые значения и не обращаются
+    к ProductAccess, Group и Lesson.
+
+    Атрибуты:
+    - product (models.OneToOneField): продукт, к которому относится статистика;
+    - students_count (models.IntegerField): количество учеников на продукте;
+    - groups_count (models.IntegerField): количество групп продукта;
+    - average_group_filling (models.FloatField): среднее заполнение групп в процентах;
+    - lessons_count (models.IntegerField): количество уроков продукта;
+    - refreshed_at (models.DateTimeField): время последнего пересчёта.
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name='stats')
+    students_count = models.IntegerField(default=0)
+    groups_count = models.IntegerField(default=0)
+    average_group_filling = models.FloatField(default=0.0)
+    lessons_count = models.IntegerField(default=0)
+    refreshed_at = models.DateTimeField()
+
+    def __str__(self):
+        """
+        Возвращает строковое представление статистики в формате "продукт (время пересчёта)".
+        """
+        return f'{self.product_id} ({self.refreshed_at})'
+
+class DirtyProduct(models.Model):
+    """
+    Модель множества продуктов, статистику которых нужно пересчитать.
+
+    Идентификатор продукта хранится без внешнего ключа, чтобы отметку можно было
+    поставить и при каскадном удалении продукта.
+
+    Атрибуты:
+    - product_id (models.BigIntegerField): идентификатор изменённого продукта;
+    - marked_at (models.DateTimeField): время последнего изменения.
+    """
+    product_id = models.BigIntegerField(primary_key=True)
+    marked_at = models.DateTimeField()
+
+    def __str__(self):
+        """
+        Возвращает строковое представление отметки в формате "продукт (время изменения)".
+        """
+        return f'{self.product_id} ({self.marked_at})'
+
+class EnrollmentRollup(models.Model):
+    """
+    Модель количества доступов к продукту, предоставленных за день.
+
+    Строки обновляются при создании и удалении доступов (см. counters), поэтому
+    временные ряды записей на продукт читают по одной строке на день,
+    а не все доступы.
+
+    Атрибуты:
+    - product (models.ForeignKey): продукт;
+    - day (models.DateField): день предоставления доступа;
+    - count (models.IntegerField): количество действующих доступов, предоставленных в этот день.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='enrollment_rollups')
+    day = models.DateField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'day'], name='app_enrollmentrollup_product_day_uniq'),
+        ]
+
+    def __str__(self):
+        """
+        Возвращает строковое представление в формате "продукт день: количество".
+        """
+        return f'{self.product_id} {self.day}: {self.count}'
+
+class SignupRollup(models.Model):
+    """
+    Модель количества пользователей, зарегистрированных за день.
+
+    Строки обновляются при создании и удалении пользователей (см. counters),
+    поэтому количество пользователей на любой день - сумма строк до этого дня,
+    и временной ряд записей считает процент приобретения на конец каждого
+    интервала, не читая таблицу пользователей.
+
+    Атрибуты:
+    - day (models.DateField): день регистрации;
+    - count (models.IntegerField): количество существующих пользователей, зарегистрированных в этот день.
+    """
+    day = models.DateField(unique=True)
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        """
+        Возвращает строковое представление в формате "день: количество".
+        """
+        return f'{self.day}: {self.count}'
@@ -0,0 +1,137 @@
+"""
+Классы пагинации API и админки.
+"""
+import json
+
+from django.conf import settings
+from django.core.paginator import EmptyPage, Paginator
+from django.db import DatabaseError, connections
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework.pagination import CursorPagination
+
+
+class IdCursorPagination(CursorPagination):
+    """
+    Курсорная пагинация по первичному ключу.
+
+    Страница выбирается условием по id и LIMIT, поэтому стоимость запроса не зависит
+    от того, насколько далеко клиент пролистал список. Размер страницы задаётся
+    параметром page_size (не больше API_MAX_PAGE_SIZE), по умолчанию используется
+    REST_FRAMEWORK['PAGE_SIZE']. Параметр paginate=false возвращает список целиком,
+    как до введения пагинации.
+    """
+    ordering = 'id'
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+    unpaginated_query_param = 'paginate'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get(self.unpaginated_query_param, '').lower() == 'false':
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор, который не считает все строки больших таблиц.
+
+    Строки считаются точно, только пока их не больше exact_count_limit: COUNT
+    выполняется по подзапросу с LIMIT. Если строк больше, количество оценивается
+    (см. estimate): для таблиц без фильтров - по статистике планировщика
+    (pg_class.reltuples в PostgreSQL, sqlite_stat1 в SQLite после ANALYZE),
+    для отфильтрованных в PostgreSQL - по оценке плана запроса (EXPLAIN).
+    Если оценки нет, например для отфильтрованных запросов в SQLite, count
+    равен exact_count_limit + 1 и означает только "больше exact_count_limit",
+    а в админке выводится как "10000+".
+
+    Количество страниц при оценке тоже приблизительно, поэтому страницы после
+    оценённой последней не отбрасываются: page читает на строку больше
+    размера страницы и, если следующая страница есть, увеличивает num_pages.
+    Ошибка EmptyPage возникает, только когда на странице нет ни одной строки.
+
+    Атрибуты:
+    - exact_count_limit (int): количество строк, до которого выполняется точный подсчёт.
+    """
+    exact_count_limit = 10000
+    _pages_seen = 0
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        limited = queryset.order_by().values('pk')[:self.exact_count_limit + 1].count()
+        if limited <= self.exact_count_limit:
+            return limited
+        return max(self.estimate(queryset), limited)
+
+    @property
+    def count_is_estimate(self):
+        """
+        True, если count - оценка, а не точное количество строк.
+        """
+        return self.count > self.exact_count_limit
+
+    @property
+    def count_label(self):
+        """
+        Количество строк для вывода: точное, "~N" для оценки или "N+" без оценки.
+        """
+        if self.count > self.exact_count_limit + 1:
+            return f'~{self.count}'
+        if self.count_is_estimate:
+            return f'{self.exact_count_limit}+'
+        return str(self.count)
+
+    @property
+    def num_pages(self):
+        return max(super().num_pages, self._pages_seen)
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            if not self.count_is_estimate or int(number) < 1:
+                raise
+            return int(number)
+
+    def page(self, number):
+        if not self.count_is_estimate:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        object_list = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not object_list and number > 1:
+            raise EmptyPage(_('That page contains no results'))
+        has_next = len(object_list) > self.per_page
+        self._pages_seen = max(self._pages_seen, number + 1 if has_next else number)
+        return self._get_page(object_list[:self.per_page], number, self)
+
+    @staticmethod
+    def estimate(queryset):
+        """
+        Возвращает оценку количества строк queryset по статистике базы данных или 0.
+        """
+        connection = connections[queryset.db]
+        if queryset.query.has_filters():
+            if connection.vendor != 'postgresql':
+                return 0
+            try:
+                plan = json.loads(queryset.order_by().explain(format='json'))
+            except (DatabaseError, ValueError):
+                return 0
+            return max(int(plan[0]['Plan']['Plan Rows']), 0)
+
+        table = queryset.model._meta.db_table
+        if connection.vendor == 'postgresql':
+            sql = 'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass'
+        elif connection.vendor == 'sqlite':
+            sql = 'SELECT CAST(stat AS INTEGER) FROM sqlite_stat1 WHERE tbl = %s LIMIT 1'
+        else:
+            return 0
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [table])
+                row = cursor.fetchone()
+        except DatabaseError:
+            return 0
+        return max(row[0], 0) if row and row[0] is not None else 0
@@ -0,0 +1,126 @@
+"""
+Генерация данных для нагрузочных тестов и замеров производительности.
+
+Данные создаются через bulk_create без сигналов, после чего счётчики продуктов
+и пользователей, дневные количества записей и статистика продуктов пересчитываются.
+"""
+import math
+import random
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.utils import timezone
+from .counters import rebuild_enrollment_rollups, rebuild_product_counters, rebuild_signup_rollups
+from .models import Product, Group, Lesson, ProductAccess, Counter
+from .stats import mark_dirty, refresh_product_stats
+
+BATCH_SIZE = 10000
+
+
+def seed_database(users_count, products_count, accesses_per_product, lessons_per_product=0, seed=0, prefix='seed'):
+    """
+    Заполняет базу пользователями, продуктами, группами, уроками и доступами.
+
+    Каждый продукт получает accesses_per_product случайных различных
+    пользователей, распределённых по группам размером max_group_size продукта
+    и записанных в случайный момент последнего года. Пользователи
+    зарегистрированы равномерно за год до этого.
+
+    Args:
+        users_count (int): количество пользователей.
+        products_count (int): количество продуктов.
+        accesses_per_product (int): количество доступов к каждому продукту.
+        lessons_per_product (int): количество уроков каждого продукта.
+        seed (int): начальное значение генератора случайных чисел.
+        prefix (str): префикс имён создаваемых пользователей и продуктов.
+
+    Returns:
+        dict: количество созданных объектов каждой модели.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    accesses_per_product = min(accesses_per_product, users_count)
+    created = {'users': 0, 'products': 0, 'groups': 0, 'lessons': 0, 'accesses': 0}
+    with transaction.atomic():
+        users = User.objects.bulk_create(
+            [
+                User(
+                    username=f'{prefix}_user_{i}',
+                    password='!',
+                    date_joined=now - timedelta(days=730 - i * 365 // users_count),
+                )
+                for i in range(users_count)
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        products = Product.objects.bulk_create(
+            [
+                Product(
+                    creator=rng.choice(users),
+                    name=f'{prefix} product {i}',
+                    start_date=now + timedelta(days=rng.randint(-365, 365)),
+                    price=rng.randint(10, 1000),
+                )
+                for i in range(products_count)
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        created['users'], created['products'] = len(users), len(products)
+
+        max_group_size = Product._meta.get_field('max_group_size').default
+        groups_per_product = math.ceil(accesses_per_product / max_group_size)
+        groups = Group.objects.bulk_create(
+            [
+                Group(
+                    product=product,
+                    name=f'{product.name} #{i + 1}',
+                    fill=min(max_group_size, accesses_per_product - i * max_group_size),
+                )
+                for product in products
+                for i in range(groups_per_product)
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        created['groups'] = len(groups)
+
+        lessons = [
+            Lesson(
+                product=product,
+                name=f'{product.name} lesson {i + 1}',
+                video_link=f'https://example.com/{product.pk}/{i + 1}.mp4',
+            )
+            for product in products
+            for i in range(lessons_per_product)
+        ]
+        for start in range(0, len(lessons), BATCH_SIZE):
+            created['lessons'] += len(Lesson.objects.bulk_create(lessons[start:start + BATCH_SIZE]))
+
+        for index, product in enumerate(products):
+            product_groups = groups[index * groups_per_product:(index + 1) * groups_per_product]
+            if accesses_per_product == users_count:
+                students = users
+            else:
+                students = rng.sample(users, accesses_per_product)
+            rows = [
+                ProductAccess(
+                    user=user,
+                    product=product,
+                    group=product_groups[i // max_group_size],
+                    created_at=now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600)),
+                )
+                for i, user in enumerate(students)
+            ]
+            ProductAccess.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+            created['accesses'] += len(rows)
+
+        rebuild_product_counters()
+        rebuild_enrollment_rollups()
+        rebuild_signup_rollups()
+        Counter.reconcile(Counter.USERS)
+        mark_dirty(product.pk for product in products)
+        refresh_product_stats()
+    if connection.vendor in ('postgresql', 'sqlite'):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+    return created
@@ -1,7 +1,44 @@
 from rest_framework import serializers
-from .models import Product, Group, Lesson, ProductAccess
+from rest_framework.validators import UniqueTogetherValidator
+from .filters import get_requested_fields
+from .middleware import timed
+from .models import Product, Group, Lesson, ProductAccess, ProductStats
 
-class ProductSerializer(serializers.ModelSerializer):
+class TimedListSerializer(serializers.ListSerializer):
+    """
+    Сериализатор списка, время работы которого учитывается в метрике serializer запроса.
+    """
+    @property
+    def data(self):
+        with timed('serializer'):
+            return super().data
+
+class TimedSerializerMixin:
+    """
+    Примесь, учитывающая время сериализации в метрике serializer запроса.
+
+    Для списков в Meta сериализатора указывается list_serializer_class = TimedListSerializer.
+    """
+    @property
+    def data(self):
+        with timed('serializer'):
+            return super().data
+
+class SparseFieldsetMixin:
+    """
+    Примесь, оставляющая в сериализаторе только поля из параметра fields запроса.
+
+    Незапрошенные поля, в том числе SerializerMethodField, не вычисляются.
+    Неизвестные имена полей не учитываются.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = get_requested_fields(self.context.get('request'))
+        if requested is not None:
+            for name in set(self.fields) - requested:
+                self.fields.pop(name)
+
+class ProductSerializer(SparseFieldsetMixin, TimedSerializerMixin, serializers.ModelSerializer):
     """
     Сериализатор для модели Product.
 
@@ -11,22 +48,113 @@ class ProductSerializer(serializers.ModelSerializer):
     - name: название продукта;
     - start_date: дата начала продукта;
     - students_count: количество студентов, занимающихся на продукте;
+    - groups_count: количество групп продукта;
     - average_group_filling: среднее значение заполненности групп в процентах;
     - price: цена продукта;
+    - max_group_size: максимальное количество учеников в группе;
+    - min_group_size: минимальное количество учеников в группе после старта продукта;
     - purchase_percent: процент приобретения продукта.
     """
     students_count = serializers.IntegerField(read_only=True)
+    groups_count = serializers.IntegerField(read_only=True)
     average_group_filling = serializers.FloatField(read_only=True)
     purchase_percent = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
+        list_serializer_class = TimedListSerializer
         fields = '__all__'
 
     def get_purchase_percent(self, obj):
-        return obj.get_purchase_percent()
+        """
+        Возвращает процент приобретения продукта.
+
+        Если продукт получен с аннотацией access_count, а общее количество
+        пользователей передано в контексте (total_users), процент вычисляется
+        без обращения к базе данных. Иначе используется Product.get_purchase_percent().
+        """
+        access_count = getattr(obj, 'access_count', None)
+        total_users = self.context.get('total_users')
+        if access_count is None or total_users is None:
+            return obj.get_purchase_percent()
+        return Product.calculate_purchase_percent(access_count, total_users)
+
+    def validate(self, attrs):
+        """
+        Проверяет, что минимальный размер группы не больше максимального.
+        """
+        max_group_size = attrs.get('max_group_size', getattr(self.instance, 'max_group_size', None))
+        min_group_size = attrs.get('min_group_size', getattr(self.instance, 'min_group_size', None))
+        if max_group_size is not None and min_group_size is not None and min_group_size > max_group_size:
+            raise serializers.ValidationError({'min_group_size': 'Не может быть больше max_group_size.'})
+        return attrs
+
+class ProductEnrollmentSerializer(serializers.Serializer):
+    """
+    Сериализатор запроса на массовое предоставление доступа к продукту.
+
+    Содержит следующие поля:
+    - users: список идентификаторов пользователей, которым нужно предоставить доступ.
+    """
+    users = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=10000,
+    )
+
+class ProductAccessExportSerializer(serializers.Serializer):
+    """
+    Сериализатор параметров выгрузки доступов к продуктам.
+
+    Содержит следующие поля:
+    - output: формат выгрузки, ndjson или csv;
+    - product: идентификатор продукта, доступы к которому нужно выгрузить;
+    - start_date_after: выгружать доступы к продуктам, начинающимся не раньше этой даты;
+    - start_date_before: выгружать доступы к продуктам, начинающимся не позже этой даты;
+    - created_after: выгружать доступы, предоставленные не раньше этого времени;
+    - created_before: выгружать доступы, предоставленные не позже этого времени.
+    """
+    output = serializers.ChoiceField(choices=['ndjson', 'csv'], default='ndjson')
+    product = serializers.IntegerField(required=False)
+    start_date_after = serializers.DateTimeField(required=False)
+    start_date_before = serializers.DateTimeField(required=False)
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+
+class EnrollmentSeriesSerializer(serializers.Serializer):
+    """
+    Сериализатор параметров временного ряда записей на продукт.
 
-class GroupSerializer(serializers.ModelSerializer):
+    Содержит следующие поля:
+    - interval: размер интервала, day или week;
+    - date_after: первый день ряда;
+    - date_before: последний день ряда.
+    """
+    interval = serializers.ChoiceField(choices=['day', 'week'], default='day')
+    date_after = serializers.DateField(required=False)
+    date_before = serializers.DateField(required=False)
+
+class VersionSerializer(serializers.Serializer):
+    """
+    Сериализатор версии объекта, которую видел клиент, при изменении одного объекта.
+
+    Содержит следующие поля:
+    - version: версия объекта, которую видел клиент.
+    """
+    version = serializers.IntegerField(min_value=1)
+
+class BulkItemSerializer(serializers.Serializer):
+    """
+    Сериализатор идентификатора объекта в массовом изменении или удалении.
+
+    Содержит следующие поля:
+    - id: идентификатор объекта;
+    - version: версия объекта, которую видел клиент.
+    """
+    id = serializers.IntegerField(min_value=1)
+    version = serializers.IntegerField(min_value=1)
+
+class GroupSerializer(SparseFieldsetMixin, TimedSerializerMixin, serializers.ModelSerializer):
     """
     Сериализатор для модели Group.
 
@@ -34,13 +162,17 @@ class GroupSerializer(serializers.ModelSerializer):
     - id: уникальный идентификатор группы;
     - product: продукт, к которому относится группа (связь с моделью Product);
     - name: название группы;
-    - users: список студентов, занимающихся в группе (связь с моделью User через модель ProductAccess).
+    - users: список студентов, занимающихся в группе (связь с моделью User через модель ProductAccess);
+    - version: номер версии группы (только для чтения);
+    - fill: количество студентов в группе (только для чтения).
     """
     class Meta:
         model = Group
-        fields = ['id', 'product', 'name', 'users']
+        list_serializer_class = TimedListSerializer
+        fields = ['id', 'product', 'name', 'users', 'version', 'fill']
+        read_only_fields = ['version', 'fill']
 
-class LessonSerializer(serializers.ModelSerializer):
+class LessonSerializer(SparseFieldsetMixin, TimedSerializerMixin, serializers.ModelSerializer):
     """
     Сериализатор для модели Lesson.
 
@@ -48,13 +180,16 @@ class LessonSerializer(serializers.ModelSerializer):
     - id: уникальный идентификатор урока;
     - product: продукт, к которому относится урок (связь с моделью Product);
     - name: название урока;
-    - video_link: ссылка на видео урока.
+    - video_link: ссылка на видео урока;
+    - version: номер версии урока (только для чтения).
     """
     class Meta:
         model = Lesson
-        fields = ['id', 'product', 'name', 'video_link']
+        list_serializer_class = TimedListSerializer
+        fields = ['id', 'product', 'name', 'video_link', 'version']
+        read_only_fields = ['version']
 
-class ProductAccessSerializer(serializers.ModelSerializer):
+class ProductAccessSerializer(SparseFieldsetMixin, TimedSerializerMixin, serializers.ModelSerializer):
     """
     Сериализатор для модели ProductAccess.
 
@@ -62,8 +197,48 @@ class ProductAccessSerializer(serializers.ModelSerializer):
     - id: уникальный идентификатор доступа к продукту;
     - user: студент, получивший доступ к продукту (связь с моделью User);
     - product: продукт, к которому получил доступ студент (связь с моделью Product);
-    - group: группа, в которую был распределен студент (связь с моделью Group).
+    - group: группа, в которую был распределен студент (связь с моделью Group);
+    - created_at: время предоставления доступа.
+
+    Пара user и product должна быть уникальной.
     """
     class Meta:
         model = ProductAccess
-        fields = ('id', 'user', 'product', 'group')
+        list_serializer_class = TimedListSerializer
+        fields = ('id', 'user', 'product', 'group', 'created_at')
+        read_only_fields = ('created_at',)
+        validators = [
+            UniqueTogetherValidator(queryset=ProductAccess.objects.all(), fields=('product', 'user')),
+        ]
+
+class ProductStatsSerializer(SparseFieldsetMixin, TimedSerializerMixin, serializers.ModelSerializer):
+    """
+    Сериализатор для модели ProductStats.
+
+    Содержит следующие поля:
+    - product: продукт, к которому относится статистика;
+    - students_count: количество учеников на продукте;
+    - groups_count: количество групп продукта;
+    - average_group_filling: среднее заполнение групп в процентах;
+    - lessons_count: количество уроков продукта;
+    - purchase_percent: процент приобретения продукта;
+    - refreshed_at: время последнего пересчёта статистики.
+
+    purchase_percent вычисляется по students_count и общему количеству пользователей
+    из контекста (total_users).
+    """
+    purchase_percent = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ProductStats
+        list_serializer_class = TimedListSerializer
+        fields = [
+            'product', 'students_count', 'groups_count', 'average_group_filling', 'lessons_count',
+            'purchase_percent', 'refreshed_at',
+        ]
+
+    def get_purchase_percent(self, obj):
+        """
+        Возвращает процент приобретения продукта.
+        """
+        return Product.calculate_purchase_percent(obj.students_count, self.context['total_users'])
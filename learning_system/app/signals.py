@@ -0,0 +1,240 @@
+"""
+Обработчики сигналов моделей приложения.
+"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from .authentication import forget_token, forget_user_tokens
+from .models import Product, Group, Lesson, ProductAccess, Counter, RebalanceJob
+from . import cache, counters, stats
+
+
+@receiver(pre_save, sender=ProductAccess)
+def remember_previous_access(sender, instance, raw=False, **kwargs):
+    """
+    Запоминает продукт и группу доступа до изменения, чтобы применить разницу счётчиков.
+    """
+    instance._previous_state = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._previous_state = ProductAccess.objects.filter(pk=instance.pk).values(
+        'user_id', 'product_id', 'group_id'
+    ).first()
+
+
+@receiver(post_save, sender=ProductAccess)
+def update_counters_on_access_save(sender, instance, created, raw=False, **kwargs):
+    """
+    Обновляет счётчики продукта и групп и дневное количество записей продукта
+    при создании доступа или смене его продукта или группы.
+    """
+    if raw:
+        return
+    previous = getattr(instance, '_previous_state', None)
+    day = timezone.localdate(instance.created_at)
+    if created or previous is None:
+        counters.apply_access_delta(instance.product_id, students=1, grouped=int(instance.group_id is not None))
+        counters.apply_group_fill_deltas({instance.group_id: 1})
+        counters.apply_enrollment_delta(instance.product_id, day, 1)
+        return
+    if previous['group_id'] != instance.group_id:
+        counters.apply_group_fill_deltas({previous['group_id']: -1, instance.group_id: 1})
+    if previous['product_id'] != instance.product_id:
+        counters.apply_access_delta(previous['product_id'], students=-1, grouped=-int(previous['group_id'] is not None))
+        counters.apply_access_delta(instance.product_id, students=1, grouped=int(instance.group_id is not None))
+        counters.apply_enrollment_delta(previous['product_id'], day, -1)
+        counters.apply_enrollment_delta(instance.product_id, day, 1)
+        return
+    grouped = int(instance.group_id is not None) - int(previous['group_id'] is not None)
+    counters.apply_access_delta(instance.product_id, grouped=grouped)
+
+
+@receiver(post_delete, sender=ProductAccess)
+def update_counters_on_access_delete(sender, instance, **kwargs):
+    """
+    Обновляет счётчики продукта и группы и дневное количество записей продукта при удалении доступа.
+    """
+    counters.apply_access_delta(instance.product_id, students=-1, grouped=-int(instance.group_id is not None))
+    counters.apply_group_fill_deltas({instance.group_id: -1})
+    counters.apply_enrollment_delta(instance.product_id, timezone.localdate(instance.created_at), -1)
+
+
+@receiver(post_save, sender=ProductAccess)
+@receiver(post_delete, sender=ProductAccess)
+def invalidate_user_products_cache(sender, instance, raw=False, **kwargs):
+    """
+    Сбрасывает закешированный список доступных продуктов пользователя доступа.
+    """
+    if raw:
+        return
+    user_ids = {instance.user_id}
+    previous = getattr(instance, '_previous_state', None)
+    if previous is not None:
+        user_ids.add(previous['user_id'])
+    cache.invalidate_user_products(user_ids)
+
+
+@receiver(post_save, sender=Group)
+def update_counters_on_group_create(sender, instance, created, raw=False, **kwargs):
+    """
+    Учитывает вместимость новой группы в среднем заполнении групп продукта.
+    """
+    if created and not raw:
+        counters.apply_group_created(instance.product_id)
+
+
+@receiver(pre_delete, sender=Group)
+def remember_deleted_group_fill(sender, instance, **kwargs):
+    """
+    Запоминает количество учеников группы из базы данных до обнуления её доступов.
+    """
+    instance._deleted_fill = Group.objects.filter(pk=instance.pk).values_list('fill', flat=True).first() or 0
+
+
+@receiver(post_delete, sender=Group)
+def update_counters_on_group_delete(sender, instance, **kwargs):
+    """
+    Уменьшает количество групп и среднее заполнение групп продукта после удаления группы.
+
+    Доступы удалённой группы обнуляются массовым UPDATE без сигналов, поэтому
+    количество распределённых учеников уменьшается на fill удалённой группы.
+    """
+    counters.apply_group_deleted(instance.product_id, getattr(instance, '_deleted_fill', instance.fill))
+
+
+@receiver([post_save, post_delete], sender=ProductAccess)
+@receiver([post_save, post_delete], sender=Group)
+@receiver([post_save, post_delete], sender=Lesson)
+def mark_product_stats_dirty(sender, instance, raw=False, **kwargs):
+    """
+    Отмечает продукт для пересчёта статистики при изменении его доступов, групп или уроков.
+    """
+    if raw:
+        return
+    product_ids = {instance.product_id}
+    previous = getattr(instance, '_previous_state', None)
+    if previous is not None:
+        product_ids.add(previous['product_id'])
+    stats.mark_dirty(product_ids)
+
+
+@receiver(pre_save, sender=Product)
+def remember_previous_group_sizes(sender, instance, raw=False, **kwargs):
+    """
+    Запоминает ограничения размера групп продукта до изменения.
+    """
+    instance._previous_group_sizes = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._previous_group_sizes = Product.objects.filter(pk=instance.pk).values_list(
+        'max_group_size', 'min_group_size'
+    ).first()
+
+
+@receiver(post_save, sender=Product)
+def apply_group_sizes_change(sender, instance, created, raw=False, **kwargs):
+    """
+    Применяет изменённые ограничения размера групп: пересчитывает среднее
+    заполнение групп и ставит задачу перераспределения учеников.
+    """
+    previous = getattr(instance, '_previous_group_sizes', None)
+    if created or raw or previous is None or previous == (instance.max_group_size, instance.min_group_size):
+        return
+    counters.rebuild_product_counters(Product.objects.filter(pk=instance.pk))
+    stats.mark_dirty([instance.pk])
+    RebalanceJob.objects.create(product=instance)
+
+
+@receiver(post_save, sender=Product)
+def mark_new_product_stats_dirty(sender, instance, created, raw=False, **kwargs):
+    """
+    Отмечает новый продукт, чтобы для него появилась строка статистики.
+    """
+    if created and not raw:
+        stats.mark_dirty([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=ProductAccess)
+@receiver([post_save, post_delete], sender=Lesson)
+def invalidate_products_cache(sender, **kwargs):
+    """
+    Сбрасывает кеш ответов о продуктах при изменении данных, от которых они зависят.
+    """
+    cache.invalidate(cache.PRODUCTS_NAMESPACE)
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Group)
+@receiver([post_save, post_delete], sender=Lesson)
+def invalidate_catalogue_cache(sender, raw=False, **kwargs):
+    """
+    Сбрасывает закешированные продукты с группами пользователей при изменении
+    продуктов, групп или уроков.
+    """
+    if not raw:
+        cache.invalidate(cache.CATALOGUE_NAMESPACE)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_products_cache_on_user_change(sender, created=True, **kwargs):
+    """
+    Сбрасывает кеш ответов о продуктах при изменении количества пользователей,
+    которое входит в purchase_percent.
+    """
+    if created:
+        cache.invalidate(cache.PRODUCTS_NAMESPACE)
+
+
+@receiver(post_save, sender=User)
+def increment_user_count(sender, instance, created, raw=False, **kwargs):
+    """
+    Увеличивает счётчик пользователей и количество регистраций за день при создании пользователя.
+    """
+    if created and not raw:
+        Counter.increment(Counter.USERS)
+        counters.apply_signup_delta(timezone.localdate(instance.date_joined), 1)
+
+
+@receiver(post_delete, sender=User)
+def decrement_user_count(sender, instance, **kwargs):
+    """
+    Уменьшает счётчик пользователей и количество регистраций за день при удалении пользователя.
+    """
+    Counter.increment(Counter.USERS, -1)
+    counters.apply_signup_delta(timezone.localdate(instance.date_joined), -1)
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    """
+    Удаляет удалённый токен из кеша аутентификации.
+    """
+    forget_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_changed_user_tokens(sender, instance, **kwargs):
+    """
+    Удаляет токены пользователя из кеша аутентификации при его изменении,
+    чтобы отключённый или удалённый пользователь не проходил аутентификацию.
+    """
+    forget_user_tokens(instance.pk)
+
+
+@receiver(connection_created)
+def configure_sqlite_connection(sender, connection, **kwargs):
+    """
+    Применяет настройки SQLITE_PRAGMAS к новому соединению с SQLite.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,84 @@
+"""
+Материализованная статистика продуктов (ProductStats).
+
+Изменения ProductAccess, Group и Lesson отмечают продукт в DirtyProduct,
+а refresh_product_stats пересчитывает статистику только отмеченных продуктов:
+одним запросом с коррелированными подзапросами и одним upsert в ProductStats.
+"""
+from django.db import transaction
+from django.utils import timezone
+from .counters import _count_subquery
+from .models import Product, ProductAccess, Group, Lesson, ProductStats, DirtyProduct
+
+
+def _mark(product_ids):
+    DirtyProduct.objects.bulk_create(
+        [DirtyProduct(product_id=product_id, marked_at=timezone.now()) for product_id in product_ids],
+        update_conflicts=True,
+        unique_fields=['product_id'],
+        update_fields=['marked_at'],
+    )
+
+
+def mark_dirty(product_ids):
+    """
+    Отмечает продукты для пересчёта статистики.
+
+    Отметка ставится сразу и ещё раз после фиксации транзакции: время отметки
+    становится больше времени начала пересчёта, который мог прочитать данные
+    до фиксации, и отметка не удаляется этим пересчётом.
+
+    Args:
+        product_ids (Iterable[int]): идентификаторы изменённых продуктов.
+    """
+    product_ids = sorted({product_id for product_id in product_ids if product_id is not None})
+    if not product_ids:
+        return
+    _mark(product_ids)
+    transaction.on_commit(lambda: _mark(product_ids))
+
+
+def refresh_product_stats(limit=None):
+    """
+    Пересчитывает статистику отмеченных продуктов и снимает с них отметку.
+
+    Отметки, поставленные после начала пересчёта, сохраняются до следующего вызова.
+
+    Args:
+        limit (int, optional): максимальное количество продуктов за вызов.
+
+    Returns:
+        int: количество пересчитанных продуктов.
+    """
+    started = timezone.now()
+    dirty = DirtyProduct.objects.order_by('product_id').values_list('product_id', flat=True)
+    product_ids = list(dirty[:limit] if limit else dirty)
+    if not product_ids:
+        return 0
+
+    rows = Product.objects.filter(pk__in=product_ids).annotate(
+        stats_students=_count_subquery(ProductAccess.objects.all()),
+        stats_grouped=_count_subquery(ProductAccess.objects.filter(group__isnull=False)),
+        stats_groups=_count_subquery(Group.objects.all()),
+        stats_lessons=_count_subquery(Lesson.objects.all()),
+    ).values_list('pk', 'max_group_size', 'stats_students', 'stats_grouped', 'stats_groups', 'stats_lessons')
+    stats = [
+        ProductStats(
+            product_id=product_id,
+            students_count=students,
+            groups_count=groups,
+            average_group_filling=100.0 * grouped / (groups * max_group_size) if groups else 0.0,
+            lessons_count=lessons,
+            refreshed_at=started,
+        )
+        for product_id, max_group_size, students, grouped, groups, lessons in rows
+    ]
+    with transaction.atomic():
+        ProductStats.objects.bulk_create(
+            stats,
+            update_conflicts=True,
+            unique_fields=['product'],
+            update_fields=['students_count', 'groups_count', 'average_group_filling', 'lessons_count', 'refreshed_at'],
+        )
+        DirtyProduct.objects.filter(product_id__in=product_ids, marked_at__lte=started).delete()
+    return len(product_ids)
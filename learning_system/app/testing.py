@@ -0,0 +1,138 @@
+"""
+Данные для тестов: фабрики объектов и снимок базы данных среднего размера.
+
+Фабрики вызываются из setUpTestData, чтобы объекты создавались один раз на класс
+тестов, а не перед каждым тестом. SnapshotTestCase загружает в тестовую базу
+данные seed_database: в SQLite они генерируются один раз, сохраняются в файл
+в TEST_SNAPSHOT_DIR и дальше копируются в базу через backup API за доли секунды.
+Файл снимка привязан к схеме базы данных и параметрам генерации, поэтому после
+новой миграции снимок создаётся заново.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+from .models import Product
+from .seeding import seed_database
+
+TEST_PASSWORD = 'testpassword'
+
+SNAPSHOT_DATASET = {
+    'users_count': 2000,
+    'products_count': 40,
+    'accesses_per_product': 250,
+    'lessons_per_product': 10,
+}
+
+
+def create_user(username='testuser', **kwargs):
+    """
+    Создаёт пользователя с паролем TEST_PASSWORD.
+    """
+    kwargs.setdefault('password', TEST_PASSWORD)
+    return get_user_model().objects.create_user(username=username, **kwargs)
+
+
+def create_users(count, prefix='student'):
+    """
+    Создаёт count пользователей с именами prefix0, prefix1, ...
+    """
+    return [create_user(f'{prefix}{i}') for i in range(count)]
+
+
+def create_product(creator, name='Test product', start_date=None, price=100, **kwargs):
+    """
+    Создаёт продукт, по умолчанию стартующий в момент создания.
+    """
+    return Product.objects.create(
+        creator=creator,
+        name=name,
+        start_date=timezone.now() if start_date is None else start_date,
+        price=price,
+        **kwargs
+    )
+
+
+def _snapshot_path(dataset):
+    schema = connection.connection.execute(
+        "SELECT sql FROM sqlite_master WHERE sql IS NOT NULL ORDER BY name"
+    ).fetchall()
+    key = hashlib.sha1(json.dumps([schema, dataset], sort_keys=True).encode()).hexdigest()[:16]
+    return Path(settings.TEST_SNAPSHOT_DIR) / f'{key}.sqlite3'
+
+
+def load_snapshot(dataset):
+    """
+    Загружает в пустую тестовую базу SQLite данные seed_database(**dataset).
+
+    Если снимка ещё нет, данные генерируются и сохраняются в файл. Файл
+    записывается во временный файл и переименовывается, поэтому процессы
+    параллельного запуска тестов не видят недописанный снимок.
+    """
+    connection.ensure_connection()
+    path = _snapshot_path(dataset)
+    if path.exists():
+        source = sqlite3.connect(path)
+        try:
+            source.backup(connection.connection)
+        finally:
+            source.close()
+        return
+
+    seed_database(**dataset)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    target = sqlite3.connect(temporary)
+    try:
+        connection.connection.backup(target)
+    finally:
+        target.close()
+    os.replace(temporary, path)
+
+
+class SnapshotTestCase(TestCase):
+    """
+    TestCase, база данных которого содержит данные seed_database(**dataset).
+
+    В SQLite данные загружаются из снимка перед тестами класса, а после них
+    база возвращается в исходное состояние. В остальных СУБД данные
+    генерируются в setUpTestData. Каждый тест, как и в TestCase, выполняется
+    в транзакции, которая откатывается.
+
+    Атрибуты:
+        dataset (dict): аргументы seed_database.
+    """
+    dataset = SNAPSHOT_DATASET
+    _empty = None
+
+    @classmethod
+    def setUpClass(cls):
+        if connection.vendor == 'sqlite':
+            connection.ensure_connection()
+            cls._empty = sqlite3.connect(':memory:')
+            connection.connection.backup(cls._empty)
+            load_snapshot(cls.dataset)
+        cache.clear()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        if cls._empty is not None:
+            cls._empty.backup(connection.connection)
+            cls._empty.close()
+            cls._empty = None
+        cache.clear()
+
+    @classmethod
+    def setUpTestData(cls):
+        if connection.vendor != 'sqlite':
+            seed_database(**cls.dataset)
@@ -1,41 +1,45 @@
-from django.test import TestCase
+import json
+from io import StringIO
+from unittest import mock
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.paginator import EmptyPage
+from django.db.models import Count
+from django.db import connection
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from datetime import timedelta
 from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIClient
-from app.models import Product, Group, ProductAccess, Lesson
+from app.models import (
+    Product, Group, ProductAccess, Lesson, Counter, RebalanceJob, ProductStats, DirtyProduct, SignupRollup,
+)
+from rest_framework.authtoken.models import Token
+from app.middleware import fingerprint
+from app.pagination import EstimatedCountPaginator
+from app.testing import SnapshotTestCase, create_product, create_user, create_users
+from app.views import ProductAccessViewSet
 
 class ProductModelTest(TestCase):
-    def setUp(self):
-        self.user = get_user_model().objects.create_user(
-            username='testuser',
-            password='testpassword'
-        )
-        self.product = Product.objects.create(
-            creator=self.user,
-            name='Test product',
-            start_date=timezone.now(),
-            price=100
-        )
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        cls.product = create_product(cls.user)
 
     def test_product_model(self):
         self.assertEqual(str(self.product), 'Test product')
 
 class GroupModelTest(TestCase):
-    def setUp(self):
-        self.user = get_user_model().objects.create_user(
-            username='testuser',
-            password='testpassword'
-        )
-        self.product = Product.objects.create(
-            creator=self.user,
-            name='Test product',
-            start_date=timezone.now(),
-            price=100
-        )
-        self.group = Group.objects.create(
-            product=self.product,
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        cls.product = create_product(cls.user)
+        cls.group = Group.objects.create(
+            product=cls.product,
             name='Test group'
         )
 
@@ -43,44 +47,310 @@ class GroupModelTest(TestCase):
         self.assertEqual(str(self.group), 'Test group')
 
 class ProductAccessModelTest(TestCase):
-    def setUp(self):
-        self.user = get_user_model().objects.create_user(
-            username='testuser',
-            password='testpassword'
-        )
-        self.product = Product.objects.create(
-            creator=self.user,
-            name='Test product',
-            start_date=timezone.now(),
-            price=100
-        )
-        self.group = Group.objects.create(
-            product=self.product,
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        cls.product = create_product(cls.user)
+        cls.group = Group.objects.create(
+            product=cls.product,
             name='Test group'
         )
-        self.product_access = ProductAccess.objects.create(
-            user=self.user,
-            product=self.product,
-            group=self.group
+        cls.product_access = ProductAccess.objects.create(
+            user=cls.user,
+            product=cls.product,
+            group=cls.group
         )
 
     def test_product_access_model(self):
         self.assertEqual(str(self.product_access), 'testuser - Test product')
 
-class LessonModelTest(TestCase):
-    def setUp(self):
-        self.user = get_user_model().objects.create_user(
-            username='testuser',
-            password='testpassword'
+class ProductCountersTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        cls.product = create_product(cls.user)
+        cls.group = Group.objects.create(
+            product=cls.product,
+            name='Test group'
+        )
+
+    def assertCounters(self, students_count, average_group_filling):
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.students_count, students_count)
+        self.assertAlmostEqual(self.product.average_group_filling, average_group_filling)
+
+    def test_access_create_and_delete(self):
+        access = ProductAccess.objects.create(user=self.user, product=self.product, group=self.group)
+        self.assertCounters(1, 20.0)
+        access.delete()
+        self.assertCounters(0, 0.0)
+
+    def test_access_group_change(self):
+        access = ProductAccess.objects.create(user=self.user, product=self.product)
+        self.assertCounters(1, 0.0)
+        access.group = self.group
+        access.save()
+        self.assertCounters(1, 20.0)
+
+    def test_group_create_and_delete(self):
+        ProductAccess.objects.create(user=self.user, product=self.product, group=self.group)
+        Group.objects.create(product=self.product, name='Second group')
+        self.assertCounters(1, 10.0)
+        self.group.delete()
+        self.assertCounters(1, 0.0)
+
+    def test_groups_count_maintained_without_counting_groups(self):
+        with CaptureQueriesContext(connection) as context:
+            ProductAccess.objects.create(user=self.user, product=self.product, group=self.group)
+        self.assertFalse([query for query in context.captured_queries if 'COUNT(' in query['sql'].upper()])
+        self.product.assign_users_to_groups(create_users(5))
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.groups_count, 2)
+        self.assertAlmostEqual(self.product.average_group_filling, 60.0)
+        Group.objects.filter(pk=self.group.pk).delete()
+        self.assertCounters(6, 60.0)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.groups_count, 1)
+
+    def test_rebuild_command(self):
+        ProductAccess.objects.create(user=self.user, product=self.product, group=self.group)
+        Product.objects.update(students_count=0, groups_count=0, average_group_filling=0)
+        call_command('rebuild_product_counters', stdout=StringIO())
+        self.assertCounters(1, 20.0)
+        self.assertEqual(self.product.groups_count, 1)
+
+class AssignUserToGroupTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.creator = create_user('creator')
+        cls.users = create_users(11)
+
+    def create_product(self, start_date):
+        return create_product(self.creator, start_date=start_date)
+
+    def group_sizes(self, product):
+        return sorted(
+            ProductAccess.objects.filter(product=product).values_list('group', flat=True)
+            .order_by().annotate(count=Count('id')).values_list('count', flat=True)
         )
-        self.product = Product.objects.create(
+
+    def test_assign_fills_least_filled_group(self):
+        product = self.create_product(timezone.now() + timedelta(days=1))
+        for user in self.users[:5]:
+            product.assign_user_to_group(user)
+        self.assertEqual(Group.objects.filter(product=product).count(), 1)
+        self.assertEqual(self.group_sizes(product), [5])
+
+    def test_assign_is_idempotent(self):
+        product = self.create_product(timezone.now() + timedelta(days=1))
+        first = product.assign_user_to_group(self.users[0])
+        second = product.assign_user_to_group(self.users[0])
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(ProductAccess.objects.filter(product=product).count(), 1)
+
+    def test_assign_rebalances_before_start(self):
+        product = self.create_product(timezone.now() + timedelta(days=1))
+        for user in self.users:
+            product.assign_user_to_group(user)
+        self.assertEqual(self.group_sizes(product), [1, 5, 5])
+        self.assertEqual(RebalanceJob.process_pending(), 1)
+        self.assertEqual(self.group_sizes(product), [3, 4, 4])
+        self.assertFalse(RebalanceJob.objects.exists())
+
+    def test_assign_keeps_min_group_size_after_start(self):
+        product = self.create_product(timezone.now() - timedelta(days=1))
+        for user in self.users[:6]:
+            product.assign_user_to_group(user)
+        self.assertEqual(self.group_sizes(product), [1, 5])
+        call_command('rebalance_worker', '--once', stdout=StringIO())
+        self.assertEqual(self.group_sizes(product), [2, 4])
+
+    def test_assign_updates_counters(self):
+        product = self.create_product(timezone.now() + timedelta(days=1))
+        for user in self.users[:6]:
+            product.assign_user_to_group(user)
+        product.refresh_from_db()
+        self.assertEqual(product.students_count, 6)
+        self.assertAlmostEqual(product.average_group_filling, 60.0)
+
+class GroupSizePolicyTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.creator = create_user('creator')
+        cls.users = create_users(12)
+
+    def assertFillMatchesAccesses(self, product):
+        fills = dict(Group.objects.filter(product=product).values_list('pk', 'fill'))
+        counts = dict(
+            ProductAccess.objects.filter(product=product, group__isnull=False)
+            .values_list('group').annotate(count=Count('id'))
+        )
+        self.assertEqual(fills, {pk: counts.get(pk, 0) for pk in fills})
+
+    def test_fill_follows_access_changes(self):
+        product = create_product(self.creator)
+        first, second = (Group.objects.create(product=product, name=f'Group {i}') for i in range(2))
+        access = ProductAccess.objects.create(user=self.users[0], product=product, group=first)
+        ProductAccess.objects.create(user=self.users[1], product=product, group=first)
+        self.assertFillMatchesAccesses(product)
+        access.group = second
+        access.save()
+        self.assertFillMatchesAccesses(product)
+        access.delete()
+        ProductAccess.objects.filter(user=self.users[1]).delete()
+        self.assertFillMatchesAccesses(product)
+
+    def test_fill_follows_assignment_and_rebalance(self):
+        product = create_product(self.creator, start_date=timezone.now() + timedelta(days=1))
+        product.assign_users_to_groups(self.users[:7])
+        product.assign_user_to_group(self.users[7])
+        self.assertFillMatchesAccesses(product)
+        RebalanceJob.process_pending()
+        self.assertEqual(sorted(Group.objects.filter(product=product).values_list('fill', flat=True)), [4, 4])
+        self.assertFillMatchesAccesses(product)
+        Group.objects.update(fill=0)
+        call_command('rebuild_product_counters', stdout=StringIO())
+        self.assertFillMatchesAccesses(product)
+
+    def test_per_product_group_sizes(self):
+        product = create_product(self.creator, max_group_size=3, min_group_size=3, start_date=timezone.now())
+        product.assign_users_to_groups(self.users[:7])
+        self.assertEqual(sorted(Group.objects.filter(product=product).values_list('fill', flat=True)), [2, 2, 3])
+        product.refresh_from_db()
+        self.assertAlmostEqual(product.average_group_filling, 700 / 9)
+        product.assign_user_to_group(self.users[7])
+        self.assertEqual(sorted(Group.objects.filter(product=product).values_list('fill', flat=True)), [2, 3, 3])
+
+    def test_new_groups_numbered_without_counting_groups(self):
+        product = create_product(self.creator, name='Course', max_group_size=2, min_group_size=1)
+        product.assign_users_to_groups(self.users[:4])
+        with CaptureQueriesContext(connection) as context:
+            product.assign_user_to_group(self.users[4])
+        self.assertFalse([query for query in context.captured_queries if 'COUNT(' in query['sql'].upper()])
+        self.assertEqual(
+            list(Group.objects.filter(product=product).order_by('pk').values_list('name', flat=True)),
+            ['Course #1', 'Course #2', 'Course #3'],
+        )
+
+    def test_selection_does_not_depend_on_groups_count(self):
+        def assignment_queries(groups_count, user):
+            product = create_product(self.creator, max_group_size=2)
+            Group.objects.bulk_create([
+                Group(product=product, name=f'Group {i}', fill=2) for i in range(groups_count - 1)
+            ] + [Group(product=product, name='Free group', fill=1)])
+            with CaptureQueriesContext(connection) as context:
+                access = product.assign_user_to_group(user)
+            self.assertEqual(access.group.name, 'Free group')
+            return context.captured_queries
+
+        small = assignment_queries(2, self.users[0])
+        large = assignment_queries(200, self.users[1])
+        self.assertEqual(len(small), len(large))
+        selection = next(query['sql'] for query in large if 'FROM "app_group"' in query['sql'])
+        self.assertIn('ORDER BY "app_group"."fill" ASC', selection)
+        self.assertIn('LIMIT 1', selection)
+
+    def test_group_sizes_change_schedules_rebalance(self):
+        product = create_product(self.creator, start_date=timezone.now() - timedelta(days=1))
+        product.assign_users_to_groups(self.users[:5])
+        RebalanceJob.objects.all().delete()
+        client = APIClient()
+        client.force_authenticate(user=self.creator)
+        url = reverse('product-detail', args=[product.id])
+        response = client.patch(url, {'min_group_size': 4, 'max_group_size': 3}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('min_group_size', response.data)
+
+        response = client.patch(url, {'max_group_size': 2}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        product.refresh_from_db()
+        self.assertAlmostEqual(product.average_group_filling, 250.0)
+        self.assertEqual(RebalanceJob.process_pending(), 1)
+        self.assertEqual(sorted(Group.objects.filter(product=product).values_list('fill', flat=True)), [1, 2, 2])
+        self.assertFillMatchesAccesses(product)
+
+class ProductStatsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        cls.product = create_product(cls.user)
+
+    def test_refresh_only_dirty_products(self):
+        other_product = Product.objects.create(
             creator=self.user,
-            name='Test product',
+            name='Other product',
             start_date=timezone.now(),
             price=100
         )
-        self.lesson = Lesson.objects.create(
-            product=self.product,
+        call_command('refresh_product_stats', stdout=StringIO())
+        self.assertFalse(DirtyProduct.objects.exists())
+        self.assertEqual(ProductStats.objects.count(), 2)
+
+        self.product.assign_user_to_group(self.user)
+        Lesson.objects.create(product=self.product, name='Test lesson', video_link='https://example.com/video.mp4')
+        self.assertEqual(list(DirtyProduct.objects.values_list('product_id', flat=True)), [self.product.pk])
+        with self.assertNumQueries(6):
+            call_command('refresh_product_stats', stdout=StringIO())
+
+        stats = ProductStats.objects.get(product=self.product)
+        self.assertEqual(
+            (stats.students_count, stats.groups_count, stats.lessons_count, stats.average_group_filling),
+            (1, 1, 1, 20.0),
+        )
+        self.assertEqual(ProductStats.objects.get(product=other_product).students_count, 0)
+
+    def test_stats_endpoint(self):
+        ProductAccess.objects.create(user=self.user, product=self.product)
+        call_command('refresh_product_stats', stdout=StringIO())
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        response = client.get(reverse('productstats-list'), format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['product'], self.product.pk)
+        self.assertEqual(response.data['results'][0]['purchase_percent'], 100.0)
+
+class UserCounterTest(TestCase):
+    def test_user_count_maintained(self):
+        self.assertEqual(Counter.get_value(Counter.USERS), 0)
+        user = get_user_model().objects.create_user(username='testuser', password='testpassword')
+        get_user_model().objects.create_user(username='otheruser', password='testpassword')
+        self.assertEqual(Counter.get_value(Counter.USERS), 2)
+        user.delete()
+        self.assertEqual(Counter.get_value(Counter.USERS), 1)
+
+    def test_signup_rollups_maintained(self):
+        today = timezone.localdate()
+        create_user('old', date_joined=timezone.now() - timedelta(days=3))
+        user = create_user('new')
+        create_user('other')
+        user.delete()
+        expected = [(today - timedelta(days=3), 1), (today, 1)]
+        self.assertEqual(list(SignupRollup.objects.order_by('day').values_list('day', 'count')), expected)
+        SignupRollup.objects.all().delete()
+        call_command('rebuild_product_counters', stdout=StringIO())
+        self.assertEqual(list(SignupRollup.objects.order_by('day').values_list('day', 'count')), expected)
+
+    def test_reconcile_command(self):
+        get_user_model().objects.create_user(username='testuser', password='testpassword')
+        Counter.objects.filter(name=Counter.USERS).update(value=100)
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertEqual(Counter.get_value(Counter.USERS), 1)
+
+    def test_missing_counter_is_recreated(self):
+        get_user_model().objects.create_user(username='testuser', password='testpassword')
+        Counter.objects.all().delete()
+        self.assertEqual(Counter.get_value(Counter.USERS), 1)
+
+    def test_purchase_percent_without_users(self):
+        self.assertEqual(Product.calculate_purchase_percent(0, 0), 0.0)
+
+class LessonModelTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        cls.product = create_product(cls.user)
+        cls.lesson = Lesson.objects.create(
+            product=cls.product,
             name='Test lesson',
             video_link='https://example.com/video.mp4'
         )
@@ -89,11 +359,12 @@ class LessonModelTest(TestCase):
         self.assertEqual(str(self.lesson), 'Test lesson')
 
 class ProductAPITest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+
     def setUp(self):
-        self.user = get_user_model().objects.create_user(
-            username='testuser',
-            password='testpassword'
-        )
+        cache.clear()
         self.client = APIClient()
         self.client.force_authenticate(user=self.user)
 
@@ -112,7 +383,193 @@ class ProductAPITest(TestCase):
         )
         response = self.client.get(reverse('product-list'), format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_list_products_purchase_percent(self):
+        other_user = get_user_model().objects.create_user(
+            username='otheruser',
+            password='testpassword'
+        )
+        products = [
+            Product.objects.create(
+                creator=self.user,
+                name=f'Test product {i}',
+                start_date=timezone.now(),
+                price=100
+            )
+            for i in range(3)
+        ]
+        ProductAccess.objects.create(user=self.user, product=products[0])
+        ProductAccess.objects.create(user=other_user, product=products[0])
+        ProductAccess.objects.create(user=other_user, product=products[1])
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('product-list'), format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        percents = {item['id']: item['purchase_percent'] for item in response.data['results']}
+        self.assertEqual(percents[products[0].id], 100.0)
+        self.assertEqual(percents[products[1].id], 50.0)
+        self.assertEqual(percents[products[2].id], 0.0)
+
+    def test_filter_and_order_products(self):
+        now = timezone.now()
+        products = [
+            Product.objects.create(
+                creator=self.user,
+                name=f'Test product {i}',
+                start_date=now + timedelta(days=i),
+                price=price
+            )
+            for i, price in enumerate([300, 100, 200])
+        ]
+        response = self.client.get(
+            reverse('product-list'), {'price__gte': 150, 'ordering': '-price'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in response.data['results']], [products[0].id, products[2].id])
+
+        response = self.client.get(reverse('product-list'), {'ordering': 'price', 'page_size': 2}, format='json')
+        self.assertEqual([item['id'] for item in response.data['results']], [products[1].id, products[2].id])
+        response = self.client.get(response.data['next'], format='json')
+        self.assertEqual([item['id'] for item in response.data['results']], [products[0].id])
+
+    def test_filter_products_invalid_value(self):
+        response = self.client.get(reverse('product-list'), {'price__lte': 'cheap'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('price__lte', response.data)
+
+    def test_sparse_fieldset_skips_purchase_percent(self):
+        Product.objects.create(
+            creator=self.user,
+            name='Test product',
+            start_date=timezone.now(),
+            price=100
+        )
+        with self.assertNumQueries(1) as context:
+            response = self.client.get(reverse('product-list'), {'fields': 'id,name'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name'})
+        self.assertNotIn('COUNT', context.captured_queries[0]['sql'].upper())
+
+    def test_my_products(self):
+        product = Product.objects.create(
+            creator=self.user,
+            name='Test product',
+            start_date=timezone.now(),
+            price=100
+        )
+        Product.objects.create(
+            creator=self.user,
+            name='Other product',
+            start_date=timezone.now(),
+            price=100
+        )
+        Lesson.objects.create(product=product, name='Test lesson', video_link='https://example.com/video.mp4')
+        group = product.assign_user_to_group(self.user).group
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('product-my'), format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]['product']['id'], product.id)
+        self.assertEqual(response.data[0]['group'], {'id': group.id, 'name': group.name})
+        self.assertEqual(response.data[0]['lessons_count'], 1)
+
+        with self.assertNumQueries(0):
+            self.client.get(reverse('product-my'), format='json')
+        Lesson.objects.create(product=product, name='Second lesson', video_link='https://example.com/video2.mp4')
+        response = self.client.get(reverse('product-my'), format='json')
+        self.assertEqual(response.data[0]['lessons_count'], 2)
+        ProductAccess.objects.filter(user=self.user).delete()
+        response = self.client.get(reverse('product-my'), format='json')
+        self.assertEqual(response.data, [])
+
+    def test_enrollment_series(self):
+        product = Product.objects.create(
+            creator=self.user,
+            name='Test product',
+            start_date=timezone.now(),
+            price=100
+        )
+        today = timezone.localdate()
+        students = [
+            get_user_model().objects.create_user(
+                username=f'student{i}', password='testpassword', date_joined=timezone.now() - timedelta(days=days)
+            )
+            for i, days in enumerate([10, 2, 0])
+        ]
+        create_user('visitor', date_joined=timezone.now() - timedelta(days=9))
+        ProductAccess.objects.create(user=students[0], product=product, created_at=timezone.now() - timedelta(days=8))
+        ProductAccess.objects.create(user=students[1], product=product, created_at=timezone.now() - timedelta(days=1))
+        product.assign_users_to_groups([students[2], self.user])
+        ProductAccess.objects.filter(user=self.user).delete()
+
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('product-enrollments', args=[product.id]), format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(item['date'], item['enrollments'], item['students']) for item in response.data['results']],
+            [(today - timedelta(days=8), 1, 1), (today - timedelta(days=1), 1, 2), (today, 1, 3)],
+        )
+        self.assertEqual([item['purchase_percent'] for item in response.data['results']], [50.0, 66.67, 60.0])
+
+        response = self.client.get(
+            reverse('product-enrollments', args=[product.id]),
+            {'interval': 'week', 'date_after': (today - timedelta(days=7)).isoformat()},
+            format='json'
+        )
+        self.assertEqual(sum(item['enrollments'] for item in response.data['results']), 2)
+        self.assertEqual(response.data['results'][-1]['students'], 3)
+
+    def test_enroll_users(self):
+        product = Product.objects.create(
+            creator=self.user,
+            name='Test product',
+            start_date=timezone.now() + timedelta(days=1),
+            price=100
+        )
+        students = [
+            get_user_model().objects.create_user(username=f'student{i}', password='testpassword')
+            for i in range(7)
+        ]
+        ProductAccess.objects.create(user=students[0], product=product)
+        user_ids = [student.id for student in students] + [0, 999999]
+        response = self.client.post(reverse('product-enroll', args=[product.id]), {'users': user_ids[1:]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(reverse('product-enroll', args=[product.id]), {'users': user_ids[:-2] + [999999]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['enrolled'], 6)
+        self.assertEqual(response.data['already_enrolled'], 1)
+        self.assertEqual(response.data['not_found'], 1)
+        self.assertEqual(response.data['results'][0], {'user': students[0].id, 'status': 'already_enrolled'})
+        self.assertEqual(ProductAccess.objects.filter(product=product).count(), 7)
+        self.assertEqual(Group.objects.filter(product=product).count(), 2)
+        product.refresh_from_db()
+        self.assertEqual(product.students_count, 7)
+        self.assertAlmostEqual(product.average_group_filling, 60.0)
+
+    def test_list_products_cached(self):
+        product = Product.objects.create(
+            creator=self.user,
+            name='Test product',
+            start_date=timezone.now(),
+            price=100
+        )
+        response = self.client.get(reverse('product-list'), format='json')
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('product-list'), format='json')
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.data['results'][0]['purchase_percent'], 0.0)
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('product-list'), format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        ProductAccess.objects.create(user=self.user, product=product)
+        response = self.client.get(reverse('product-list'), format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['results'][0]['purchase_percent'], 100.0)
+        self.assertEqual(response.data['results'][0]['students_count'], 1)
 
     def test_retrieve_product(self):
         product = Product.objects.create(
@@ -126,19 +583,14 @@ class ProductAPITest(TestCase):
         self.assertEqual(response.data['name'], 'Test product')
 
 class GroupAPITest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        cls.product = create_product(cls.user)
+
     def setUp(self):
-        self.user = get_user_model().objects.create_user(
-            username='testuser',
-            password='testpassword'
-        )
         self.client = APIClient()
         self.client.force_authenticate(user=self.user)
-        self.product = Product.objects.create(
-            creator=self.user,
-            name='Test product',
-            start_date=timezone.now(),
-            price=100
-        )
 
     def test_list_groups(self):
         Group.objects.create(
@@ -151,7 +603,7 @@ class GroupAPITest(TestCase):
         )
         response = self.client.get(reverse('group-list'), format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data['results']), 2)
 
     def test_retrieve_group(self):
         group = Group.objects.create(
@@ -162,24 +614,40 @@ class GroupAPITest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['name'], 'Test group')
 
+    def test_bulk_delete_groups(self):
+        groups = [Group.objects.create(product=self.product, name=f'Test group {i}') for i in range(3)]
+        payload = [{'id': group.id, 'version': group.version} for group in groups[:2]]
+        response = self.client.delete(reverse('group-bulk'), payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(list(Group.objects.values_list('id', flat=True)), [groups[2].id])
+
+    def test_bulk_delete_groups_conflict(self):
+        groups = [Group.objects.create(product=self.product, name=f'Test group {i}') for i in range(2)]
+        response = self.client.put(
+            reverse('group-detail', args=[groups[1].id]),
+            {'product': self.product.id, 'name': 'Renamed', 'version': 1},
+            format='json'
+        )
+        self.assertEqual(response.data['version'], 2)
+        payload = [{'id': group.id, 'version': 1} for group in groups]
+        response = self.client.delete(reverse('group-bulk'), payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['conflicts'], [{'id': groups[1].id, 'version': 2}])
+        self.assertEqual(Group.objects.count(), 2)
+
 class ProductAccessAPITest(TestCase):
-    def setUp(self):
-        self.user = get_user_model().objects.create_user(
-            username='testuser',
-            password='testpassword'
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        cls.product = create_product(cls.user)
+        cls.group = Group.objects.create(
+            product=cls.product,
+            name='Test group'
         )
+
+    def setUp(self):
         self.client = APIClient()
         self.client.force_authenticate(user=self.user)
-        self.product = Product.objects.create(
-            creator=self.user,
-            name='Test product',
-            start_date=timezone.now(),
-            price=100
-        )
-        self.group = Group.objects.create(
-            product=self.product,
-            name='Test group'
-        )
 
     def test_create_product_access(self):
         data = {
@@ -195,19 +663,79 @@ class ProductAccessAPITest(TestCase):
         self.assertEqual(ProductAccess.objects.get().group, self.group)
 
     def test_list_product_accesses(self):
+        other_user = get_user_model().objects.create_user(
+            username='otheruser',
+            password='testpassword'
+        )
         ProductAccess.objects.create(
             user=self.user,
             product=self.product,
             group=self.group
         )
         ProductAccess.objects.create(
-            user=self.user,
+            user=other_user,
             product=self.product,
             group=self.group
         )
         response = self.client.get(reverse('productaccess-list'), format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_create_duplicate_product_access(self):
+        data = {
+            'user': self.user.id,
+            'product': self.product.id,
+            'group': self.group.id
+        }
+        self.client.post(reverse('productaccess-list'), data, format='json')
+        response = self.client.post(reverse('productaccess-list'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(ProductAccess.objects.count(), 1)
+
+    def test_export_product_accesses(self):
+        other_user = get_user_model().objects.create_user(
+            username='otheruser',
+            password='testpassword'
+        )
+        other_product = Product.objects.create(
+            creator=self.user,
+            name='Other product',
+            start_date=timezone.now() + timedelta(days=10),
+            price=100
+        )
+        ProductAccess.objects.create(user=self.user, product=self.product, group=self.group)
+        ProductAccess.objects.create(user=other_user, product=other_product)
+
+        response = self.client.get(reverse('productaccess-export'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['username'], 'testuser')
+        self.assertEqual(rows[0]['product_name'], 'Test product')
+        self.assertEqual(rows[0]['group_name'], 'Test group')
+        self.assertIsNone(rows[1]['group'])
+
+        response = self.client.get(reverse('productaccess-export'), {
+            'output': 'csv',
+            'start_date_after': (timezone.now() + timedelta(days=1)).isoformat(),
+        })
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,user,username,product,product_name,group,group_name,created_at')
+        self.assertEqual(len(lines), 2)
+        self.assertIn('otheruser', lines[1])
+
+        response = self.client.get(reverse('productaccess-export'), {'product': self.product.id})
+        self.assertEqual(len(b''.join(response.streaming_content).decode().splitlines()), 1)
+
+        ProductAccess.objects.filter(user=other_user).update(created_at=timezone.now() - timedelta(days=30))
+        response = self.client.get(reverse('productaccess-export'), {
+            'created_after': (timezone.now() - timedelta(days=1)).isoformat(),
+        })
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['username'] for row in rows], ['testuser'])
+
+        response = self.client.get(reverse('productaccess-export'), {'output': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
     def test_retrieve_product_access(self):
         product_access = ProductAccess.objects.create(
@@ -222,19 +750,14 @@ class ProductAccessAPITest(TestCase):
         self.assertEqual(response.data['group'], self.group.id)
 
 class LessonAPITest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        cls.product = create_product(cls.user)
+
     def setUp(self):
-        self.user = get_user_model().objects.create_user(
-            username='testuser',
-            password='testpassword'
-        )
         self.client = APIClient()
         self.client.force_authenticate(user=self.user)
-        self.product = Product.objects.create(
-            creator=self.user,
-            name='Test product',
-            start_date=timezone.now(),
-            price=100
-        )
 
     def test_list_lessons(self):
         Lesson.objects.create(
@@ -249,7 +772,76 @@ class LessonAPITest(TestCase):
         )
         response = self.client.get(reverse('lesson-list'), format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_list_lessons_paginated(self):
+        lessons = [
+            Lesson.objects.create(
+                product=self.product,
+                name=f'Test lesson {i}',
+                video_link=f'https://example.com/video{i}.mp4'
+            )
+            for i in range(5)
+        ]
+        response = self.client.get(reverse('lesson-list'), {'page_size': 2}, format='json')
+        self.assertEqual([item['id'] for item in response.data['results']], [lesson.id for lesson in lessons[:2]])
+        response = self.client.get(response.data['next'], format='json')
+        self.assertEqual([item['id'] for item in response.data['results']], [lesson.id for lesson in lessons[2:4]])
+        self.assertIsNotNone(response.data['previous'])
+
+    def test_list_lessons_unpaginated(self):
+        for i in range(3):
+            Lesson.objects.create(
+                product=self.product,
+                name=f'Test lesson {i}',
+                video_link=f'https://example.com/video{i}.mp4'
+            )
+        response = self.client.get(reverse('lesson-list'), {'paginate': 'false'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 3)
+
+    def test_my_lessons(self):
+        cache.clear()
+        other_product = Product.objects.create(
+            creator=self.user,
+            name='Other product',
+            start_date=timezone.now(),
+            price=100
+        )
+        lesson = Lesson.objects.create(
+            product=self.product,
+            name='Test lesson',
+            video_link='https://example.com/video.mp4'
+        )
+        Lesson.objects.create(
+            product=other_product,
+            name='Other lesson',
+            video_link='https://example.com/other.mp4'
+        )
+        response = self.client.get(reverse('lesson-my'), format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [])
+
+        self.product.assign_user_to_group(self.user)
+        response = self.client.get(reverse('lesson-my'), format='json')
+        self.assertEqual([item['id'] for item in response.data['results']], [lesson.id])
+
+        ProductAccess.objects.filter(user=self.user).delete()
+        response = self.client.get(reverse('lesson-my'), format='json')
+        self.assertEqual(response.data['results'], [])
+
+    def test_my_lessons_uses_cached_product_ids(self):
+        cache.clear()
+        ProductAccess.objects.create(user=self.user, product=self.product)
+        self.client.get(reverse('lesson-my'), format='json')
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('lesson-my'), format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_my_lessons_requires_authentication(self):
+        self.client.force_authenticate(user=None)
+        response = self.client.get(reverse('lesson-my'), format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
     def test_retrieve_lesson(self):
         lesson = Lesson.objects.create(
@@ -260,3 +852,399 @@ class LessonAPITest(TestCase):
         response = self.client.get(reverse('lesson-detail', args=[lesson.id]), format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['name'], 'Test lesson')
+
+    def create_lessons(self, count):
+        return [
+            Lesson.objects.create(
+                product=self.product,
+                name=f'Test lesson {i}',
+                video_link=f'https://example.com/video{i}.mp4'
+            )
+            for i in range(count)
+        ]
+
+    def test_bulk_update_lessons(self):
+        lessons = self.create_lessons(3)
+        payload = [
+            {'id': lesson.id, 'version': lesson.version, 'video_link': f'https://cdn.example.com/{lesson.id}.mp4'}
+            for lesson in lessons
+        ]
+        with self.assertNumQueries(5):
+            response = self.client.patch(reverse('lesson-bulk'), payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['version'] for item in response.data], [2, 2, 2])
+        self.assertEqual(
+            list(Lesson.objects.order_by('id').values_list('video_link', flat=True)),
+            [f'https://cdn.example.com/{lesson.id}.mp4' for lesson in lessons],
+        )
+
+    def test_bulk_update_lessons_conflict_rolls_back(self):
+        lessons = self.create_lessons(2)
+        Lesson.objects.filter(pk=lessons[0].pk).update(version=5)
+        payload = [{'id': lesson.id, 'version': 1, 'name': 'Renamed'} for lesson in lessons]
+        response = self.client.patch(reverse('lesson-bulk'), payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['conflicts'], [{'id': lessons[0].id, 'version': 5}])
+        self.assertEqual(
+            list(Lesson.objects.order_by('id').values_list('name', 'version')),
+            [('Test lesson 0', 5), ('Test lesson 1', 1)],
+        )
+
+    def test_stale_single_updates_conflict_with_bulk_update(self):
+        lesson = self.create_lessons(1)[0]
+        url = reverse('lesson-detail', args=[lesson.id])
+        response = self.client.patch(url, {'name': 'First', 'version': 1}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['version'], 2)
+        response = self.client.patch(url, {'name': 'Second', 'version': 1}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['conflicts'], [{'id': lesson.id, 'version': 2}])
+        response = self.client.patch(url, {'name': 'Second'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.patch(
+            reverse('lesson-bulk'), [{'id': lesson.id, 'version': 1, 'name': 'Bulk'}], format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['conflicts'], [{'id': lesson.id, 'version': 2}])
+        self.assertEqual(Lesson.objects.values_list('name', 'version').get(), ('First', 2))
+
+    def test_bulk_update_lessons_validation(self):
+        lesson = self.create_lessons(1)[0]
+        response = self.client.patch(
+            reverse('lesson-bulk'), [{'id': lesson.id, 'version': 1, 'video_link': 'not a url'}], format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.patch(
+            reverse('lesson-bulk'), [{'id': lesson.id, 'version': 1, 'product': self.product.id}], format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class AdminTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_user('admin', is_staff=True, is_superuser=True)
+        product = create_product(cls.admin)
+        product.assign_users_to_groups(create_users(3))
+        Lesson.objects.create(product=product, name='Test lesson', video_link='https://example.com/video.mp4')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_changelists(self):
+        for model in (Product, Group, Lesson, ProductAccess):
+            url = reverse(f'admin:app_{model._meta.model_name}_changelist')
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            response = self.client.get(url, {'q': 'abc'})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_access_changelist_query_count_does_not_depend_on_rows(self):
+        url = reverse('admin:app_productaccess_changelist')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+        product = Product.objects.get()
+        product.assign_users_to_groups(create_users(7, prefix='other'))
+        with self.assertNumQueries(len(context.captured_queries)):
+            self.client.get(url)
+
+    def test_estimated_count_paginator(self):
+        class SmallLimitPaginator(EstimatedCountPaginator):
+            exact_count_limit = 2
+
+        queryset = ProductAccess.objects.order_by('id')
+        self.assertEqual(EstimatedCountPaginator(queryset, 2).count, 3)
+        self.assertEqual(SmallLimitPaginator(queryset.filter(product__isnull=False), 2).count, 3)
+        self.assertGreaterEqual(SmallLimitPaginator(queryset, 2).count, 3)
+
+    def test_pages_after_estimated_count_are_reachable(self):
+        class SmallLimitPaginator(EstimatedCountPaginator):
+            exact_count_limit = 2
+
+        Product.objects.get().assign_users_to_groups(create_users(7, prefix='other'))
+        queryset = ProductAccess.objects.filter(product__isnull=False).order_by('id')
+        paginator = SmallLimitPaginator(queryset, 2)
+        self.assertEqual(paginator.count, 3)
+        self.assertTrue(paginator.count_is_estimate)
+        self.assertEqual(paginator.count_label, '2+')
+        self.assertEqual(paginator.num_pages, 2)
+        page = paginator.page(4)
+        self.assertEqual(list(page.object_list), list(queryset[6:8]))
+        self.assertTrue(page.has_next())
+        self.assertEqual(paginator.num_pages, 5)
+        page = paginator.page(5)
+        self.assertEqual(list(page.object_list), list(queryset[8:10]))
+        self.assertFalse(page.has_next())
+        with self.assertRaises(EmptyPage):
+            paginator.page(6)
+
+    def test_changelist_shows_estimated_count(self):
+        Product.objects.get().assign_users_to_groups(create_users(7, prefix='other'))
+        url = reverse('admin:app_productaccess_changelist')
+        with mock.patch.object(EstimatedCountPaginator, 'exact_count_limit', 5), \
+                mock.patch('app.admin.ProductAccessAdmin.list_per_page', 2):
+            response = self.client.get(url, {'q': Product.objects.get().pk, 'p': 5})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertContains(response, '5+ product access')
+        self.assertEqual(len(response.context['cl'].result_list), 2)
+
+class TokenAuthenticationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+
+    def setUp(self):
+        cache.clear()
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+
+    def test_obtain_token(self):
+        response = self.client.post(
+            reverse('api-token'), {'username': 'testuser', 'password': 'testpassword'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['token'], self.token.key)
+
+    def test_verified_token_is_cached(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('lesson-my'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('lesson-my'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('sessionid', response.cookies)
+
+    def test_deleted_token_and_inactive_user_are_rejected(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.client.get(reverse('lesson-my'))
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('lesson-my')).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.token.delete()
+        self.assertEqual(self.client.get(reverse('lesson-my')).status_code, status.HTTP_401_UNAUTHORIZED)
+
+class QueryCountTest(TestCase):
+    """
+    Ограничивает количество SQL-запросов эндпоинтов, чтобы новые N+1 ломали тесты.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        cls.students = create_users(3)
+        for i in range(3):
+            product = create_product(cls.user, name=f'Test product {i}')
+            for j in range(2):
+                Lesson.objects.create(
+                    product=product,
+                    name=f'Test lesson {j}',
+                    video_link=f'https://example.com/video{j}.mp4'
+                )
+            for student in cls.students:
+                product.assign_user_to_group(student)
+        cls.product = product
+        cls.group = Group.objects.filter(product=product).first()
+        cls.lesson = Lesson.objects.filter(product=product).first()
+        cls.product_access = ProductAccess.objects.filter(product=product).first()
+        call_command('refresh_product_stats', stdout=StringIO())
+        cls.product_stats = ProductStats.objects.get(product=product)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def assertEndpointQueries(self, num, url, client=None):
+        with self.assertNumQueries(num):
+            response = (client or self.client).get(url, format='json')
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_product_endpoints(self):
+        self.assertEndpointQueries(2, reverse('product-list'))
+        self.assertEndpointQueries(2, reverse('product-detail', args=[self.product.id]))
+
+    def test_product_extra_endpoints(self):
+        self.assertEndpointQueries(1, reverse('product-my'))
+        self.assertEndpointQueries(3, reverse('product-enrollments', args=[self.product.id]))
+
+    def test_product_stats_endpoints(self):
+        self.assertEndpointQueries(2, reverse('productstats-list'))
+        self.assertEndpointQueries(2, reverse('productstats-detail', args=[self.product_stats.id]))
+
+    def test_group_endpoints(self):
+        self.assertEndpointQueries(2, reverse('group-list'))
+        self.assertEndpointQueries(2, reverse('group-detail', args=[self.group.id]))
+
+    def test_lesson_endpoints(self):
+        self.assertEndpointQueries(1, reverse('lesson-list'))
+        self.assertEndpointQueries(1, reverse('lesson-detail', args=[self.lesson.id]))
+        self.assertEndpointQueries(1, reverse('lesson-my'))
+
+    def test_product_access_endpoints(self):
+        self.assertEndpointQueries(1, reverse('productaccess-list'))
+        self.assertEndpointQueries(1, reverse('productaccess-detail', args=[self.product_access.id]))
+        self.assertEndpointQueries(1, reverse('productaccess-export'))
+        product_access = ProductAccessViewSet.queryset.get(pk=self.product_access.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(str(product_access), f'{product_access.user.username} - {self.product.name}')
+
+    def test_async_endpoints(self):
+        async_client = AsyncClient()
+        for num, url in (
+            (2, reverse('async-product-list')),
+            (2, reverse('async-product-detail', args=[self.product.id])),
+            (1, reverse('async-lesson-list')),
+            (1, reverse('async-lesson-detail', args=[self.lesson.id])),
+        ):
+            with self.subTest(url=url), self.assertNumQueries(num):
+                response = async_to_sync(async_client.get)(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+class SnapshotQueryCountTest(SnapshotTestCase):
+    """
+    Проверяет количество запросов и результаты эндпоинтов на данных среднего размера.
+    """
+    def setUp(self):
+        cache.clear()
+        self.user = ProductAccess.objects.order_by('id').first().user
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_snapshot_loaded(self):
+        dataset = self.dataset
+        self.assertEqual(Product.objects.count(), dataset['products_count'])
+        self.assertEqual(
+            ProductAccess.objects.count(),
+            dataset['products_count'] * dataset['accesses_per_product']
+        )
+        self.assertEqual(Counter.get_value(Counter.USERS), dataset['users_count'])
+
+    def test_list_endpoints(self):
+        for name, num in (('product-list', 2), ('group-list', 2), ('lesson-list', 1), ('productaccess-list', 1)):
+            with self.assertNumQueries(num):
+                response = self.client.get(reverse(name), {'page_size': 1000}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_my_products_and_lessons(self):
+        product_ids = set(ProductAccess.objects.filter(user=self.user).values_list('product_id', flat=True))
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('product-my'), format='json')
+        self.assertEqual({item['product']['id'] for item in response.data}, product_ids)
+        response = self.client.get(reverse('lesson-my'), {'page_size': 1000}, format='json')
+        self.assertEqual(
+            len(response.data['results']),
+            len(product_ids) * self.dataset['lessons_per_product']
+        )
+
+    def test_stats_match_data(self):
+        stats = ProductStats.objects.order_by('product_id').values_list('product_id', 'students_count')
+        counts = ProductAccess.objects.order_by('product_id').values_list('product_id').annotate(count=Count('id'))
+        self.assertEqual(list(stats), list(counts))
+        fills = Group.objects.order_by('id').values_list('id', 'fill')
+        counts = ProductAccess.objects.order_by('group_id').values_list('group_id').annotate(count=Count('id'))
+        self.assertEqual(list(fills), list(counts))
+
+    def test_export_streams_all_rows(self):
+        response = self.client.get(reverse('productaccess-export'))
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(len(lines), ProductAccess.objects.count())
+
+class RequestMetricsMiddlewareTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        cls.product = create_product(cls.user)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=1)
+    def test_metrics_collected(self):
+        with self.assertLogs('app.requests', level='INFO') as logs:
+            response = self.client.get(reverse('lesson-list'), format='json')
+        self.assertIn('sql;dur=', response['Server-Timing'])
+        self.assertIn('serializer;dur=', response['Server-Timing'])
+        self.assertIn('total;dur=', response['Server-Timing'])
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['path'], reverse('lesson-list'))
+        self.assertEqual(record['sql_count'], 1)
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=1)
+    async def test_metrics_collected_for_async_view(self):
+        with self.assertLogs('app.requests', level='INFO') as logs:
+            response = await self.async_client.get(reverse('async-product-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['path'], reverse('async-product-list'))
+        self.assertGreater(record['sql_count'], 0)
+        self.assertNotIn('desc="0 queries"', response['Server-Timing'])
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=1)
+    def test_metrics_collected_for_streaming_export(self):
+        ProductAccess.objects.create(user=self.user, product=self.product)
+        with self.assertLogs('app.requests', level='INFO') as logs, CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('productaccess-export'))
+            self.assertEqual(logs.records, [])
+            lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertFalse(response.has_header('Server-Timing'))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['path'], reverse('productaccess-export'))
+        self.assertGreater(record['sql_count'], 0)
+        self.assertEqual(record['sql_count'], len(context.captured_queries))
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=0)
+    def test_metrics_not_sampled(self):
+        response = self.client.get(reverse('lesson-list'), format='json')
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_fingerprint(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM app_product WHERE id IN (%s, %s) AND name = 'x''y' LIMIT 21"),
+            'SELECT * FROM app_product WHERE id IN (...) AND name = ? LIMIT ?',
+        )
+
+class AsyncViewsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        cls.products = [create_product(cls.user, name=f'Test product {i}') for i in range(3)]
+        ProductAccess.objects.create(user=cls.user, product=cls.products[0])
+        cls.lesson = Lesson.objects.create(
+            product=cls.products[0],
+            name='Test lesson',
+            video_link='https://example.com/video.mp4'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    async def test_async_product_list_matches_viewset(self):
+        response = await self.async_client.get(reverse('async-product-list'), {'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(len(data['results']), 2)
+        next_response = await self.async_client.get(data['next'])
+        next_data = next_response.json()
+        self.assertEqual(len(next_data['results']), 1)
+        self.assertIsNone(next_data['next'])
+
+        expected = (await sync_to_async(self.client.get)(reverse('product-list'), format='json')).json()
+        self.assertEqual(data['results'] + next_data['results'], expected['results'])
+
+    async def test_async_product_detail(self):
+        response = await self.async_client.get(reverse('async-product-detail', args=[self.products[0].id]))
+        self.assertEqual(response.json()['purchase_percent'], 100.0)
+        response = await self.async_client.get(reverse('async-product-detail', args=[0]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_async_lesson_detail_matches_viewset(self):
+        response = await self.async_client.get(reverse('async-lesson-detail', args=[self.lesson.id]))
+        expected = await sync_to_async(self.client.get)(reverse('lesson-detail', args=[self.lesson.id]), format='json')
+        self.assertEqual(response.json(), expected.json())
@@ -7,22 +7,33 @@
 
 * path и include из django.urls для определения маршрутов;
 * DefaultRouter из rest_framework.routers для автоматического создания маршрутов для наборов представлений;
-* ProductViewSet, GroupViewSet, LessonViewSet, ProductAccessViewSet из .views для регистрации маршрутов.
+* ProductViewSet, GroupViewSet, LessonViewSet, ProductAccessViewSet, ProductStatsViewSet из .views для регистрации маршрутов;
+* AsyncProductView, AsyncLessonView из .async_views для асинхронного чтения продуктов и уроков;
+* obtain_auth_token из rest_framework.authtoken.views для получения токена по логину и паролю.
 
-Создается экземпляр DefaultRouter и регистрируются наборы просмотров для моделей Product, Group, Lesson, ProductAccess.
+Создается экземпляр DefaultRouter и регистрируются наборы просмотров для моделей Product, Group, Lesson, ProductAccess, ProductStats.
 
-Список urlpatterns определяет единый маршрут - включение всех маршрутов, созданных с использованием DefaultRouter.
+Список urlpatterns включает маршрут получения токена (auth/token/), маршруты асинхронных представлений (префикс async/) и все маршруты,
+созданные с использованием DefaultRouter.
 """
 from django.urls import path, include
+from rest_framework.authtoken.views import obtain_auth_token
 from rest_framework.routers import DefaultRouter
-from .views import ProductViewSet, GroupViewSet, LessonViewSet, ProductAccessViewSet
+from .async_views import AsyncProductView, AsyncLessonView
+from .views import ProductViewSet, GroupViewSet, LessonViewSet, ProductAccessViewSet, ProductStatsViewSet
 
 router = DefaultRouter()
 router.register(r'products', ProductViewSet)
 router.register(r'groups', GroupViewSet)
 router.register(r'lessons', LessonViewSet)
 router.register(r'productaccess', ProductAccessViewSet)
+router.register(r'productstats', ProductStatsViewSet)
 
 urlpatterns = [
+    path('auth/token/', obtain_auth_token, name='api-token'),
+    path('async/products/', AsyncProductView.as_view(), name='async-product-list'),
+    path('async/products/<int:pk>/', AsyncProductView.as_view(), name='async-product-detail'),
+    path('async/lessons/', AsyncLessonView.as_view(), name='async-lesson-list'),
+    path('async/lessons/<int:pk>/', AsyncLessonView.as_view(), name='async-lesson-detail'),
     path('', include(router.urls)),
 ]
@@ -1,31 +1,417 @@
-from rest_framework import viewsets
-from .models import Product, Group, Lesson, ProductAccess
-from .serializers import ProductSerializer, GroupSerializer, LessonSerializer, ProductAccessSerializer
+import csv
+import json
+from datetime import timedelta
 
-class ProductViewSet(viewsets.ModelViewSet):
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F, Prefetch, Sum
+from django.db.models.functions import TruncWeek
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from .cache import (
+    CachedResponseMixin, CATALOGUE_NAMESPACE, PRODUCTS_NAMESPACE, get_user_memberships, get_user_product_ids, invalidate,
+)
+from .filters import get_requested_fields
+from .models import Product, Group, Lesson, ProductAccess, Counter, ProductStats, EnrollmentRollup, SignupRollup
+from .serializers import (
+    ProductSerializer, ProductEnrollmentSerializer, GroupSerializer, LessonSerializer, ProductAccessSerializer,
+    ProductAccessExportSerializer, ProductStatsSerializer, BulkItemSerializer, EnrollmentSeriesSerializer, VersionSerializer,
+)
+
+class Echo:
+    """
+    Буфер, который возвращает записанную строку, для потоковой записи csv.writer.
+    """
+    def write(self, value):
+        return value
+
+class BulkEditMixin:
+    """
+    Примесь для ViewSet, добавляющая массовое изменение (PATCH) и удаление (DELETE)
+    объектов по адресу <префикс>/bulk/.
+
+    Тело запроса - список объектов с полями id и version, для PATCH также с
+    изменяемыми полями из bulk_update_fields. Все изменения выполняются в одной
+    транзакции: версии объектов увеличиваются одним UPDATE и сверяются с присланными.
+    Если хотя бы один объект изменён или удалён другим запросом, транзакция
+    откатывается и возвращается 409 с текущими версиями конфликтующих объектов.
+    Иначе изменения записываются одним bulk_update, а удаление выполняется одним delete().
+
+    Изменение одного объекта (PUT/PATCH) тоже требует version, которую видел
+    клиент: версия увеличивается тем же UPDATE с проверкой, что и при массовом
+    изменении, и при несовпадении возвращается такой же ответ 409.
+
+    Атрибуты:
+    - bulk_update_fields (tuple): поля, которые можно изменять массово;
+    - bulk_max_items (int): максимальное количество объектов в запросе.
+    """
+    bulk_update_fields = ()
+    bulk_max_items = 1000
+
+    def update(self, request, *args, **kwargs):
+        partial = kwargs.pop('partial', False)
+        version = VersionSerializer(data=request.data)
+        version.is_valid(raise_exception=True)
+        with transaction.atomic():
+            instance = self.get_object()
+            instances, conflicts = self.claim_versions(
+                self.queryset.model, {instance.pk: version.validated_data['version']}
+            )
+            if conflicts:
+                transaction.set_rollback(True)
+                return Response({'conflicts': conflicts}, status=status.HTTP_409_CONFLICT)
+            serializer = self.get_serializer(instances[instance.pk], data=request.data, partial=partial)
+            serializer.is_valid(raise_exception=True)
+            self.perform_update(serializer)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['patch', 'delete'], url_path='bulk')
+    def bulk(self, request):
+        items = BulkItemSerializer(
+            data=request.data, many=True, allow_empty=False, max_length=self.bulk_max_items
+        )
+        items.is_valid(raise_exception=True)
+        versions = {item['id']: item['version'] for item in items.validated_data}
+        if len(versions) != len(items.validated_data):
+            raise ValidationError({'id': ['Объекты в запросе не должны повторяться.']})
+
+        changes = None
+        if request.method == 'PATCH':
+            serializer = self.get_serializer(data=request.data, many=True, partial=True)
+            serializer.is_valid(raise_exception=True)
+            changes = serializer.validated_data
+            for data in changes:
+                forbidden = set(data) - set(self.bulk_update_fields)
+                if forbidden:
+                    raise ValidationError({field: ['Поле нельзя изменять массово.'] for field in forbidden})
+
+        model = self.queryset.model
+        with transaction.atomic():
+            instances, conflicts = self.claim_versions(model, versions)
+            if conflicts:
+                transaction.set_rollback(True)
+                return Response({'conflicts': conflicts}, status=status.HTTP_409_CONFLICT)
+            if changes is None:
+                model.objects.filter(pk__in=versions).delete()
+                return Response(status=status.HTTP_204_NO_CONTENT)
+
+            for item, data in zip(items.validated_data, changes):
+                for field, value in data.items():
+                    setattr(instances[item['id']], field, value)
+            fields = {field for data in changes for field in data}
+            if fields:
+                model.objects.bulk_update(instances.values(), sorted(fields))
+                invalidate(CATALOGUE_NAMESPACE)
+        return Response(self.get_serializer([instances[pk] for pk in versions], many=True).data)
+
+    @staticmethod
+    def claim_versions(model, versions):
+        """
+        Увеличивает версии объектов и проверяет, что до изменения они совпадали с присланными.
+
+        UPDATE блокирует строки до конца транзакции, поэтому объекты, прочитанные
+        после него, не могут измениться параллельным запросом.
+
+        Args:
+            model (Model): модель объектов.
+            versions (dict): версии объектов, которые видел клиент, по id.
+
+        Returns:
+            tuple[dict, list[dict]]: объекты с увеличенными версиями по id и конфликтующие
+            объекты с текущей версией (None, если объект удалён).
+        """
+        model.objects.filter(pk__in=versions).update(version=F('version') + 1)
+        instances = model.objects.in_bulk(list(versions))
+        conflicts = [
+            {'id': pk, 'version': instances[pk].version - 1 if pk in instances else None}
+            for pk, version in versions.items()
+            if pk not in instances or instances[pk].version != version + 1
+        ]
+        return instances, conflicts
+
+class ProductViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     """
     Конечная точка API, которая позволяет просматривать или редактировать пользователей.
+
+    Ответы list и retrieve кешируются и поддерживают ETag/If-None-Match.
+    Список фильтруется по creator, start_date и price и сортируется по
+    start_date и price, параметр fields ограничивает возвращаемые поля.
     """
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
+    cache_namespace = PRODUCTS_NAMESPACE
+    filter_fields = {
+        'creator': ['exact'],
+        'start_date': ['exact', 'gte', 'lte'],
+        'price': ['exact', 'gte', 'lte'],
+    }
+    ordering_fields = ['id', 'start_date', 'price']
+
+    def get_queryset(self):
+        """
+        Возвращает продукты с количеством доступов, посчитанным одним запросом.
+
+        Если параметр fields не содержит purchase_percent, количество доступов
+        не считается, а из базы читаются только запрошенные поля.
+        """
+        queryset = super().get_queryset()
+        fields = get_requested_fields(self.request)
+        if fields is None:
+            return queryset.with_access_count()
+        if 'purchase_percent' in fields:
+            queryset = queryset.with_access_count()
+        concrete = {field.name for field in Product._meta.concrete_fields}
+        return queryset.only('id', *(fields & concrete))
+
+    def get_serializer_context(self):
+        """
+        Добавляет в контекст сериализатора общее количество пользователей.
+
+        Количество читается из счётчика один раз за запрос и используется для вычисления
+        purchase_percent всех продуктов в ответе.
+        """
+        context = super().get_serializer_context()
+        fields = get_requested_fields(self.request)
+        if self.action in ('list', 'retrieve') and (fields is None or 'purchase_percent' in fields):
+            context['total_users'] = Counter.get_value(Counter.USERS)
+        return context
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def my(self, request):
+        """
+        Возвращает продукты текущего пользователя с его группой и количеством уроков.
 
-class GroupViewSet(viewsets.ModelViewSet):
+        Ответ строится одним запросом (см. ProductAccess.objects.memberships)
+        и кешируется для пользователя до изменения его доступов, продуктов,
+        групп или уроков.
+        """
+        return Response(get_user_memberships(request.user.pk))
+
+    @action(detail=True, methods=['get'])
+    def enrollments(self, request, pk=None):
+        """
+        Возвращает временной ряд записей на продукт по дням или неделям.
+
+        Ряд читается только из EnrollmentRollup и SignupRollup, поэтому стоимость
+        запроса зависит от количества интервалов и дней регистраций, а не от
+        количества доступов и пользователей. Для каждого интервала возвращаются
+        количество записей (enrollments), количество учеников на конец интервала
+        (students) и процент приобретения относительно количества пользователей,
+        зарегистрированных к концу интервала (purchase_percent).
+        """
+        product = get_object_or_404(Product.objects.only('pk'), pk=pk)
+        params = EnrollmentSeriesSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        filters = params.validated_data
+
+        rollups = EnrollmentRollup.objects.filter(product=product)
+        students = 0
+        if 'date_after' in filters:
+            students = rollups.filter(day__lt=filters['date_after']).aggregate(total=Sum('count'))['total'] or 0
+            rollups = rollups.filter(day__gte=filters['date_after'])
+        if 'date_before' in filters:
+            rollups = rollups.filter(day__lte=filters['date_before'])
+        bucket = TruncWeek('day') if filters['interval'] == 'week' else F('day')
+        rows = list(
+            rollups.annotate(bucket=bucket).values('bucket').annotate(enrollments=Sum('count')).order_by('bucket')
+        )
+
+        signups = iter(())
+        if rows:
+            last_day = rows[-1]['bucket'] + timedelta(days=6 if filters['interval'] == 'week' else 0)
+            signups = iter(
+                SignupRollup.objects.filter(day__lte=last_day).annotate(bucket=bucket).values('bucket').annotate(
+                    users=Sum('count')
+                ).order_by('bucket')
+            )
+        signup = next(signups, None)
+        users = 0
+        results = []
+        for row in rows:
+            while signup is not None and signup['bucket'] <= row['bucket']:
+                users += signup['users']
+                signup = next(signups, None)
+            students += row['enrollments']
+            results.append({
+                'date': row['bucket'],
+                'enrollments': row['enrollments'],
+                'students': students,
+                'purchase_percent': Product.calculate_purchase_percent(students, users),
+            })
+        return Response({'interval': filters['interval'], 'results': results})
+
+    @action(detail=True, methods=['post'], serializer_class=ProductEnrollmentSerializer)
+    def enroll(self, request, pk=None):
+        """
+        Предоставляет доступ к продукту списку пользователей и распределяет их по группам.
+
+        Все пользователи распределяются за один проход, доступы создаются одним bulk_create.
+        В ответе для каждого пользователя указывается статус: enrolled, already_enrolled
+        или not_found, а для новых учеников - группа.
+        """
+        product = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user_ids = list(dict.fromkeys(serializer.validated_data['users']))
+
+        users = list(User.objects.filter(pk__in=user_ids).only('pk'))
+        accesses = product.assign_users_to_groups(users)
+        groups = {access.user_id: access.group_id for access in accesses}
+        found = {user.pk for user in users}
+
+        results = []
+        for user_id in user_ids:
+            if user_id in groups:
+                results.append({'user': user_id, 'status': 'enrolled', 'group': groups[user_id]})
+            elif user_id in found:
+                results.append({'user': user_id, 'status': 'already_enrolled'})
+            else:
+                results.append({'user': user_id, 'status': 'not_found'})
+        summary = {
+            status_name: sum(1 for result in results if result['status'] == status_name)
+            for status_name in ('enrolled', 'already_enrolled', 'not_found')
+        }
+        return Response({**summary, 'results': results})
+
+class GroupViewSet(BulkEditMixin, viewsets.ModelViewSet):
     """
     Конечная точка API, которая позволяет просматривать или редактировать пользователей.
+
+    Названия групп можно изменять, а группы удалять массово (см. BulkEditMixin).
     """
-    queryset = Group.objects.all()
+    queryset = Group.objects.only('id', 'product_id', 'name', 'version', 'fill')
     serializer_class = GroupSerializer
+    filter_fields = {'product': ['exact']}
+    bulk_update_fields = ('name',)
 
-class LessonViewSet(viewsets.ModelViewSet):
+    def get_queryset(self):
+        """
+        Возвращает группы с предзагруженными учениками, если поле users запрошено.
+        """
+        queryset = super().get_queryset()
+        fields = get_requested_fields(self.request)
+        if fields is None or 'users' in fields:
+            queryset = queryset.prefetch_related(Prefetch('users', queryset=User.objects.only('id')))
+        return queryset
+
+class LessonViewSet(BulkEditMixin, viewsets.ModelViewSet):
     """
     Конечная точка API, которая позволяет просматривать или редактировать пользователей.
+
+    Названия и ссылки на видео уроков можно изменять, а уроки удалять массово
+    (см. BulkEditMixin).
     """
-    queryset = Lesson.objects.all()
+    queryset = Lesson.objects.only('id', 'product_id', 'name', 'video_link', 'version')
     serializer_class = LessonSerializer
+    filter_fields = {'product': ['exact']}
+    bulk_update_fields = ('name', 'video_link')
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def my(self, request):
+        """
+        Возвращает уроки продуктов, к которым у текущего пользователя есть доступ.
+
+        id доступных продуктов берутся из кеша (см. get_user_product_ids), уроки
+        выбираются одним запросом по индексу (product, id) и разбиваются на страницы.
+        """
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            product_id__in=get_user_product_ids(request.user.pk)
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(queryset, many=True).data)
 
 class ProductAccessViewSet(viewsets.ModelViewSet):
     """
     Конечная точка API, которая позволяет просматривать или редактировать пользователей.
     """
-    queryset = ProductAccess.objects.all()
+    queryset = ProductAccess.objects.select_related('user', 'product').only(
+        'id', 'user_id', 'product_id', 'group_id', 'created_at', 'user__username', 'product__name'
+    )
     serializer_class = ProductAccessSerializer
+    filter_fields = {'product': ['exact'], 'user': ['exact'], 'group': ['exact'], 'created_at': ['gte', 'lte']}
+
+    export_fields = (
+        ('id', 'id'),
+        ('user', 'user_id'),
+        ('username', 'user__username'),
+        ('product', 'product_id'),
+        ('product_name', 'product__name'),
+        ('group', 'group_id'),
+        ('group_name', 'group__name'),
+        ('created_at', 'created_at'),
+    )
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        """
+        Потоково выгружает доступы к продуктам с именами пользователей, продуктов и групп.
+
+        Строки читаются через values_list(...).iterator() порциями по
+        EXPORT_CHUNK_SIZE и сразу отправляются клиенту, поэтому расход памяти
+        не зависит от объёма выгрузки. Формат задаётся параметром output
+        (ndjson или csv), фильтры - параметрами product, start_date_after,
+        start_date_before, created_after и created_before.
+        """
+        params = ProductAccessExportSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        filters = params.validated_data
+
+        queryset = ProductAccess.objects.order_by('id')
+        if 'product' in filters:
+            queryset = queryset.filter(product_id=filters['product'])
+        if 'start_date_after' in filters:
+            queryset = queryset.filter(product__start_date__gte=filters['start_date_after'])
+        if 'start_date_before' in filters:
+            queryset = queryset.filter(product__start_date__lte=filters['start_date_before'])
+        if 'created_after' in filters:
+            queryset = queryset.filter(created_at__gte=filters['created_after'])
+        if 'created_before' in filters:
+            queryset = queryset.filter(created_at__lte=filters['created_before'])
+        names = [name for name, _ in self.export_fields]
+        rows = queryset.values_list(*[field for _, field in self.export_fields]).iterator(
+            chunk_size=settings.EXPORT_CHUNK_SIZE
+        )
+
+        if filters['output'] == 'csv':
+            writer = csv.writer(Echo())
+            content = (writer.writerow(row) for row in self.with_header(names, rows))
+            response = StreamingHttpResponse(content, content_type='text/csv; charset=utf-8')
+            response['Content-Disposition'] = 'attachment; filename="productaccess.csv"'
+        else:
+            content = (json.dumps(dict(zip(names, row)), ensure_ascii=False, cls=DjangoJSONEncoder) + '\n' for row in rows)
+            response = StreamingHttpResponse(content, content_type='application/x-ndjson; charset=utf-8')
+        return response
+
+    @staticmethod
+    def with_header(header, rows):
+        yield header
+        yield from rows
+
+class ProductStatsViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Конечная точка API для чтения статистики продуктов.
+
+    Статистика читается из материализованной таблицы ProductStats, которую
+    пересчитывает команда refresh_product_stats, и не обращается к доступам,
+    группам и урокам.
+    """
+    queryset = ProductStats.objects.all()
+    serializer_class = ProductStatsSerializer
+    filter_fields = {'product': ['exact']}
+
+    def get_serializer_context(self):
+        """
+        Добавляет в контекст сериализатора общее количество пользователей.
+        """
+        context = super().get_serializer_context()
+        context['total_users'] = Counter.get_value(Counter.USERS)
+        return context
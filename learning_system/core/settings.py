@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -38,16 +39,18 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'app',
-    'rest_framework'
+    'rest_framework',
+    'rest_framework.authtoken',
 ]
 
 MIDDLEWARE = [
+    'app.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'app.middleware.SiteSessionMiddleware',
     'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
+    'app.middleware.SiteCsrfViewMiddleware',
+    'app.middleware.SiteAuthenticationMiddleware',
+    'app.middleware.SiteMessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -75,11 +78,116 @@ WSGI_APPLICATION = 'core.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+#
+# The profile is selected with the DATABASE_PROFILE environment variable:
+# - sqlite (default): SQLite with WAL journal, configured in app.signals on connection;
+# - postgresql: PostgreSQL with persistent connections. For pooling put PgBouncer
+#   in front of the server and set POSTGRES_DISABLE_SERVER_SIDE_CURSORS=1 when it
+#   runs in transaction pooling mode.
+
+DATABASE_PROFILE = os.environ.get('DATABASE_PROFILE', 'sqlite')
+
+if DATABASE_PROFILE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'learning_system'),
+            'USER': os.environ.get('POSTGRES_USER', 'postgres'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            'CONN_MAX_AGE': int(os.environ.get('DATABASE_CONN_MAX_AGE', 600)),
+            'CONN_HEALTH_CHECKS': True,
+            'DISABLE_SERVER_SIDE_CURSORS': os.environ.get('POSTGRES_DISABLE_SERVER_SIDE_CURSORS') == '1',
+        }
     }
+elif DATABASE_PROFILE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': int(os.environ.get('DATABASE_CONN_MAX_AGE', 600)),
+            'OPTIONS': {
+                'timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 20)),
+            },
+        }
+    }
+else:
+    raise ValueError(f'Unknown DATABASE_PROFILE: {DATABASE_PROFILE}')
+
+# PRAGMA statements executed on every new SQLite connection.
+# SQLITE_TUNING=0 switches back to the default rollback journal, e.g. for load test comparisons.
+
+if os.environ.get('SQLITE_TUNING', '1') == '1':
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 20)) * 1000,
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    }
+else:
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'DELETE',
+    }
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+#
+# Local memory by default. Set REDIS_URL (e.g. redis://localhost:6379/0) to share
+# the cache between processes.
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Seconds a cached API response is kept (see app.cache).
+
+API_CACHE_TIMEOUT = int(os.environ.get('API_CACHE_TIMEOUT', 300))
+
+
+# Request metrics (see app.middleware.RequestMetricsMiddleware).
+# Share of requests, from 0 to 1, for which SQL and timing metrics are collected.
+
+REQUEST_METRICS_SAMPLE_RATE = float(os.environ.get('REQUEST_METRICS_SAMPLE_RATE', 0.05))
+
+
+# Tests
+# Test runs keep cached SQLite snapshots of seeded data (see app.testing) in
+# TEST_SNAPSHOT_DIR. Faster password hashing and disabled request metrics
+# sampling are set in core.settings_test.
+
+TEST_SNAPSHOT_DIR = os.environ.get('TEST_SNAPSHOT_DIR', BASE_DIR / '.test_snapshots')
+
+
+# Logging
+# https://docs.djangoproject.com/en/5.0/topics/logging/
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'app.requests': {
+            'handlers': ['console'],
+            'level': os.environ.get('REQUEST_METRICS_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
 }
 
 
@@ -123,3 +231,38 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Django REST framework
+# https://www.django-rest-framework.org/api-guide/settings/
+
+REST_FRAMEWORK = {
+    'DEFAULT_PAGINATION_CLASS': 'app.pagination.IdCursorPagination',
+    'PAGE_SIZE': 100,
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'app.authentication.CachedTokenAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+    ],
+    'DEFAULT_FILTER_BACKENDS': [
+        'app.filters.FieldFilterBackend',
+        'app.filters.IndexedOrderingFilter',
+    ],
+}
+
+API_MAX_PAGE_SIZE = 1000
+
+# Requests under this prefix skip the session, CSRF and message middleware
+# and therefore authenticate with a token; session authentication only
+# applies when the API is mounted outside this prefix.
+
+API_PATH_PREFIX = '/api/'
+
+# Verified API tokens are cached in-process for this many seconds.
+
+API_TOKEN_CACHE_TIMEOUT = int(os.environ.get('API_TOKEN_CACHE_TIMEOUT', 60))
+
+API_TOKEN_CACHE_SIZE = 10000
+
+# Rows fetched from the database per round trip by streaming exports.
+
+EXPORT_CHUNK_SIZE = 2000
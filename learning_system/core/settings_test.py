@@ -0,0 +1,18 @@
+"""
+Django settings for running the test suite.
+
+Use with any test runner:
+
+    python manage.py test --settings core.settings_test
+    DJANGO_SETTINGS_MODULE=core.settings_test python manage.py test
+"""
+
+from .settings import *  # noqa: F401,F403
+
+# Hash passwords with MD5 instead of PBKDF2 to speed up creating users.
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+# Request metrics are enabled explicitly by the tests that check them.
+
+REQUEST_METRICS_SAMPLE_RATE = 0